@@ -0,0 +1,181 @@
+# app/cache.py
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from fastapi import Request, Response
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.compression import COMPRESSION_MIN_SIZE, choose_encoding, compress
+from app.serialization import encode_json
+
+# How often a worker re-reads the catalog version from the database
+CATALOG_VERSION_POLL_SECONDS = float(os.getenv("CATALOG_VERSION_POLL_SECONDS", "5"))
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "512"))
+
+
+def get_catalog_version(db: Session) -> int:
+    row = db.query(models.CatalogVersion.version).filter(models.CatalogVersion.id == 1).first()
+    return row[0] if row else 0
+
+
+def bump_catalog_version(db: Session) -> int:
+    """Increment the catalog version inside the caller's transaction.
+
+    A transaction bumps at most once, so every talk and tool it writes shares
+    one version. Every worker drops its cached catalog responses once the
+    commit is visible.
+    """
+    version = db.info.get("catalog_version")
+    if version is not None:
+        return version
+    # Core statements only: this also runs from inside a flush
+    table = models.CatalogVersion.__table__
+    updated = db.execute(
+        table.update()
+        .where(table.c.id == 1)
+        .values(version=table.c.version + 1, updated_at=datetime.utcnow())
+    ).rowcount
+    if not updated:
+        db.execute(table.insert().values(id=1, version=1, updated_at=datetime.utcnow()))
+    version = db.execute(select(table.c.version).where(table.c.id == 1)).scalar()
+    db.info["catalog_version"] = version
+    return version
+
+
+class CatalogCache:
+    """Serialized catalog responses keyed by (endpoint, filter, language).
+
+    Entries are tagged with the catalog version they were built from. The
+    version itself is re-read at most every ``poll_seconds``, so cache hits
+    don't touch the database at all.
+    """
+
+    def __init__(self, max_entries: int = CATALOG_CACHE_MAX_ENTRIES, poll_seconds: float = CATALOG_VERSION_POLL_SECONDS):
+        self.max_entries = max_entries
+        self.poll_seconds = poll_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+
+    def version(self, db: Session) -> int:
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at >= self.poll_seconds:
+            version = get_catalog_version(db)
+            with self._lock:
+                if version != self._version:
+                    self._entries.clear()
+                    self._version = version
+                self._checked_at = now
+        return self._version
+
+    def get_or_build(self, db: Session, key: tuple, build, encoding=None):
+        """Return ``(version, body, encoding)`` for ``key``, building it on a miss.
+
+        With an ``encoding`` the body comes back compressed, provided it's big
+        enough. Each entry compresses at most once per encoding.
+        """
+        version = self.version(db)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+            else:
+                entry = None
+
+        if entry is None:
+            # The dict holds the compressed variants of the body
+            entry = (version, encode_json(build()), {})
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        version, body, variants = entry
+        if encoding is None or len(body) < COMPRESSION_MIN_SIZE:
+            return version, body, None
+        if encoding not in variants:
+            variants[encoding] = compress(body, encoding, cached=True)
+        return version, variants[encoding], encoding
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+
+catalog_cache = CatalogCache()
+
+
+def catalog_etag(version: int, key: tuple) -> str:
+    digest = hashlib.sha1(repr((version,) + key).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison function
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in [c[2:] if c.startswith("W/") else c for c in candidates]
+
+
+def catalog_response(request: Request, db: Session, key: tuple, build) -> Response:
+    """Serve a catalog payload, answering revalidations with 304.
+
+    A matching If-None-Match is answered from the in-memory catalog version
+    alone: no query and no serialization. Compressed bodies are cached too,
+    so the compression middleware passes them straight through.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    # Each encoding is its own representation with its own ETag
+    etag_key = key + (encoding,)
+    etag = catalog_etag(catalog_cache.version(db), etag_key)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    version, body, encoding = catalog_cache.get_or_build(db, key, build, encoding)
+    headers["ETag"] = catalog_etag(version, etag_key)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_catalog_changes(session, flush_context, instances):
+    # Sync clients ask for rows changed since a version, so every write to the
+    # catalog carries the version of the transaction that made it
+    catalog_types = (models.Talk, models.Tool)
+    changed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, catalog_types) and session.is_modified(obj)
+    ]
+    deleted = any(isinstance(obj, catalog_types) for obj in session.deleted)
+    if not changed and not deleted:
+        return
+    version = bump_catalog_version(session)
+    now = datetime.utcnow()
+    for obj in changed:
+        obj.catalog_version = version
+        obj.updated_at = now
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_bump(session):
+    # Lets the worker that ran the ingestion see its own change immediately
+    if session.info.pop("catalog_version", None) is not None:
+        catalog_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_bump(session):
+    session.info.pop("catalog_version", None)
@@ -0,0 +1,148 @@
+# app/catalog_bundles.py
+
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import catalog_cache, get_catalog_version
+from app.serialization import catalog_query, catalog_row, encode_json
+
+try:
+    import brotli
+except ImportError:  # optional: bundles are still served gzip-compressed
+    brotli = None
+
+# Outside app/static: bundles are only served through the authenticated
+# /catalog routes
+BUNDLE_DIR = os.getenv(
+    "CATALOG_BUNDLE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "catalog_bundles")
+)
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = ".build.lock"
+# Superseded bundles stay this long for clients still holding their URLs
+BUNDLE_GRACE_SECONDS = int(os.getenv("CATALOG_BUNDLE_GRACE_SECONDS", "3600"))
+
+
+def build_bundle_payload(db: Session, language: str, version: int) -> dict:
+    talks = [
+        catalog_row(row) for row in
+        catalog_query(db, models.Talk).filter(models.Talk.language == language).order_by(models.Talk.id)
+    ]
+    tools = [
+        catalog_row(row) for row in
+        catalog_query(db, models.Tool).filter(models.Tool.language == language).order_by(models.Tool.id)
+    ]
+    return {
+        "version": version,
+        "language": language,
+        "talks": talks,
+        "tools": tools,
+        "hazards": sorted({t["hazard"] for t in talks if t["hazard"]}),
+        "industries": sorted({t["industry"] for t in talks if t["industry"]}),
+    }
+
+
+def bundle_path(language: str, digest: str, encoding: str) -> str:
+    return os.path.join(BUNDLE_DIR, f"{language}.{digest}.json.{encoding}")
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def load_manifest():
+    try:
+        with open(os.path.join(BUNDLE_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def manifest_version(manifest) -> int:
+    return manifest.get("version", -1) if manifest else -1
+
+
+@contextmanager
+def _bundle_dir_lock():
+    # Serializes builds across worker processes sharing the directory
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    with open(os.path.join(BUNDLE_DIR, LOCK_NAME), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def build_catalog_bundles(db: Session) -> dict:
+    """Write one compressed JSON bundle per language and a manifest naming them.
+
+    Bundle file names carry a hash of their content, so a URL never changes
+    meaning and clients may cache it forever. The version comes straight from
+    the database, and a manifest is never replaced by an older one.
+    """
+    with _bundle_dir_lock():
+        version = get_catalog_version(db)
+        previous = load_manifest()
+        if manifest_version(previous) >= version:
+            return previous
+        return _build(db, version, previous or {})
+
+
+def _build(db: Session, version: int, previous: dict) -> dict:
+    languages = {language for (language,) in db.query(models.Talk.language).distinct()}
+    languages |= {language for (language,) in db.query(models.Tool.language).distinct()}
+
+    bundles = {}
+    for language in sorted(languages):
+        body = encode_json(build_bundle_payload(db, language, version))
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        if not os.path.exists(bundle_path(language, digest, "gz")):
+            # mtime=0 keeps the gzip bytes reproducible across rebuilds
+            _write_atomic(bundle_path(language, digest, "gz"), gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write_atomic(bundle_path(language, digest, "br"), brotli.compress(body))
+        bundles[language] = digest
+
+    manifest = {"version": version, "bundles": bundles}
+    _write_atomic(os.path.join(BUNDLE_DIR, MANIFEST_NAME), json.dumps(manifest).encode("utf-8"))
+
+    # Files of the last two generations always stay; anything else only once
+    # it is past the grace period, since other hosts' manifests, redirects
+    # already sent and half-written temp files may still name it
+    keep = {f"{language}.{digest}." for language, digest in bundles.items()}
+    keep |= {f"{language}.{digest}." for language, digest in previous.get("bundles", {}).items()}
+    expired = time.time() - BUNDLE_GRACE_SECONDS
+    for name in os.listdir(BUNDLE_DIR):
+        if name in (MANIFEST_NAME, LOCK_NAME) or any(name.startswith(prefix) for prefix in keep):
+            continue
+        path = os.path.join(BUNDLE_DIR, name)
+        try:
+            if os.path.getmtime(path) < expired:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+    return manifest
+
+
+def current_manifest(db: Session) -> dict:
+    """Manifest for the current catalog version, building bundles if it's stale.
+
+    The polled version may lag behind the database, so it only decides
+    whether to look closer; a newer manifest than it is served as is.
+    """
+    manifest = load_manifest()
+    if manifest_version(manifest) >= catalog_cache.version(db):
+        return manifest
+    return build_catalog_bundles(db)
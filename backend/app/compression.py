@@ -0,0 +1,166 @@
+# app/compression.py
+
+import gzip
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional: responses fall back to gzip
+    brotli = None
+
+# Below this many bytes compression costs more than it saves
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Per-request compression has to be cheap; cached catalog bodies are
+# compressed once per catalog version and can afford more effort
+GZIP_LEVEL = 6
+GZIP_LEVEL_CACHED = 9
+BROTLI_QUALITY = 5
+BROTLI_QUALITY_CACHED = 9
+
+# Images, PDFs and the like are already compressed; compressing them again
+# costs CPU for nothing
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def compressible(content_type) -> bool:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return any(
+        media_type.startswith(allowed) if allowed.endswith("/") else media_type == allowed
+        for allowed in COMPRESSIBLE_TYPES
+    )
+
+
+def accepted_encodings(accept_encoding) -> dict:
+    """Parse an Accept-Encoding header into ``{coding: qvalue}``."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """The best encoding the client accepts that we can produce, or None."""
+    accepted = accepted_encodings(accept_encoding)
+    best, best_q = None, 0.0
+    for encoding in ("br", "gzip") if brotli is not None else ("gzip",):
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY_CACHED if cached else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL_CACHED if cached else GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress, self.finish = compressor.compress, compressor.flush
+
+
+class CompressionMiddleware:
+    """Compress JSON and text responses with gzip or brotli, whichever the
+    client prefers.
+
+    Other media types, and responses that already carry a Content-Encoding
+    (precompressed catalog entries and bundles), pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, CompressingSend(send, encoding, self.minimum_size))
+
+
+class CompressingSend:
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.passthrough = False
+        self.compressor = None
+
+    def _mark_compressed(self, content_length=None):
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        headers.add_vary_header("Accept-Encoding")
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows how big the response is
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or not compressible(headers.get("content-type"))
+            )
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+            if self.passthrough:
+                await self.send(self.start_message)
+                self.start_message = None
+                await self.send(message)
+                return
+            if not more_body:
+                body = compress(body, self.encoding)
+                message = {"type": "http.response.body", "body": body}
+                self._mark_compressed(len(body))
+            else:
+                # Streamed response: compress chunk by chunk, length unknown
+                self._mark_compressed()
+                self.compressor = StreamCompressor(self.encoding)
+            await self.send(self.start_message)
+            self.start_message = None
+
+        if self.compressor is None:
+            await self.send(message)
+            return
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
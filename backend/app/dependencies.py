@@ -1,30 +1,67 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app import models, database
+from app.ttl_cache import TTLCache
 from app.jwt_token import verify_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(token_str: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(
+# Other workers only drop a changed user when the entry expires, so keep this short
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user's public fields, detached from any session."""
+    id: int
+    username: str
+    email: str
+    phone: Optional[str] = None
+    profile_image: Optional[str] = None
+
+
+principal_cache = TTLCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_ENTRIES)
+
+
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = verify_access_token(token_str)
-        if payload is None:
-            raise credentials_exception
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise credentials_exception
-    except:
-        raise credentials_exception
-
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+
+def invalidate_principal(user_id: int):
+    """Call after committing a change to the user's row."""
+    principal_cache.pop(user_id)
+
+
+def get_current_user_id(token_str: str = Depends(oauth2_scheme)) -> int:
+    """Claims-only authentication, for routes that just need the user's ID."""
+    payload = verify_access_token(token_str)
+    user_id = payload.get("user_id") if payload else None
+    if user_id is None:
+        raise credentials_exception()
+    return user_id
+
+
+def get_current_user(user_id: int = Depends(get_current_user_id), db: Session = Depends(database.get_db)) -> Principal:
+    """The authenticated user, from the principal cache when possible."""
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = db.query(
+        models.User.id, models.User.username, models.User.email, models.User.phone, models.User.profile_image
+    ).filter(models.User.id == user_id).first()
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
 
-    return user
+    principal = Principal(*user)
+    principal_cache.set(user_id, principal)
+    return principal
@@ -1,12 +1,21 @@
+import hashlib
+import os
+import time
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from typing import Optional
+from app.ttl_cache import TTLCache
+from app.metrics import metrics
 
 # to get a string like this run:
 # openssl rand -hex 32
 SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
+# Verified claims by token digest, each kept until the token expires
+token_cache = TTLCache(ACCESS_TOKEN_EXPIRE_MINUTES * 60, TOKEN_CACHE_MAX_ENTRIES)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -19,8 +28,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def verify_access_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    """The token's claims, or None if it is invalid or expired. Treat the
+    returned dict as read-only: it is shared with later requests."""
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        metrics.increment("jwt.cache_hits")
         return payload
+    metrics.increment("jwt.cache_misses")
+
+    try:
+        with metrics.timer("jwt.verify"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
+    # Rejected tokens aren't cached, so garbage can't crowd out real ones
+    expires_in = payload.get("exp", 0) - time.time()
+    if expires_in > 0:
+        token_cache.set(key, payload, ttl_seconds=expires_in)
+    return payload
@@ -0,0 +1,239 @@
+# app/like_buffer.py
+
+import logging
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+from app.like_counters import adjust_talk_like_count
+
+LIKE_BUFFER_ENABLED = os.getenv("LIKE_BUFFER_ENABLED", "false").lower() == "true"
+LIKE_BUFFER_FLUSH_SECONDS = float(os.getenv("LIKE_BUFFER_FLUSH_SECONDS", "1"))
+LIKE_BUFFER_MAX_EVENTS = int(os.getenv("LIKE_BUFFER_MAX_EVENTS", "500"))
+
+
+def talk_like_state(db: Session, user_id: int, talk_id: int):
+    """``(group_id, stored like_count, stored user_liked)`` for a talk, or None."""
+    user_liked = db.query(models.TalkLike.id).filter(
+        models.TalkLike.group_id == models.Talk.group_id,
+        models.TalkLike.user_id == user_id
+    ).exists()
+    row = db.query(models.Talk.group_id, models.TalkGroupStats.like_count, user_liked).outerjoin(
+        models.TalkGroupStats, models.TalkGroupStats.group_id == models.Talk.group_id
+    ).filter(models.Talk.id == talk_id).first()
+    if row is None:
+        return None
+    return row[0], row[1] or 0, row[2]
+
+
+class LikeBuffer:
+    """Write-behind queue for talk like toggles.
+
+    Toggles are answered from memory and written in bulk every
+    ``flush_seconds`` or once ``max_events`` are waiting. Repeated toggles by
+    a user on one translation group collapse into their final state, and a
+    toggle that returns to the stored state is dropped. Counters change at
+    flush time, by the rows the flush actually inserted or deleted.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        enabled: bool = LIKE_BUFFER_ENABLED,
+        flush_seconds: float = LIKE_BUFFER_FLUSH_SECONDS,
+        max_events: int = LIKE_BUFFER_MAX_EVENTS
+    ):
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.flush_seconds = flush_seconds
+        self.max_events = max_events
+        # (user_id, group_id) -> (liked, talk_id, stored, tapped_at)
+        self._pending = {}
+        # The batch being written; still counts as state until it commits
+        self._flushing = {}
+        # group_id -> net like change of the entries in _pending / _flushing
+        self._pending_delta = Counter()
+        self._flushing_delta = Counter()
+        # Bumped whenever a flushed batch is published
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _entry(self, key):
+        return self._pending.get(key) or self._flushing.get(key)
+
+    def _group_delta(self, group_id):
+        return self._pending_delta.get(group_id, 0) + self._flushing_delta.get(group_id, 0)
+
+    @staticmethod
+    def _shift(deltas, group_id, delta):
+        deltas[group_id] += delta
+        if not deltas[group_id]:
+            del deltas[group_id]
+
+    @contextmanager
+    def _stored_state(self, db: Session, user_id: int, talk_id: int):
+        """talk_like_state() holding the buffer lock, retried until no flush
+        was published during the read. A read racing a commit may or may
+        not see it, and combined with the buffer it would count a batch
+        twice or not at all."""
+        while True:
+            with self._lock:
+                generation = self._generation
+            state = talk_like_state(db, user_id, talk_id)
+            with self._lock:
+                if self._generation == generation:
+                    yield state
+                    return
+
+    def like_state(self, db: Session, user_id: int, talk_id: int):
+        """``(group_id, like_count, user_liked)`` including queued toggles, or None."""
+        with self._stored_state(db, user_id, talk_id) as state:
+            if state is None:
+                return None
+            group_id, like_count, user_liked = state
+            entry = self._entry((user_id, group_id))
+            if entry is not None:
+                user_liked = entry[0]
+            return group_id, like_count + self._group_delta(group_id), user_liked
+
+    def overlay(self, user_id: int, group_id: int, like_count: int, user_liked: bool):
+        """Adjust stored like state by the events still waiting to be written."""
+        with self._lock:
+            entry = self._entry((user_id, group_id))
+            if entry is not None:
+                user_liked = entry[0]
+            return like_count + self._group_delta(group_id), user_liked
+
+    def toggle(self, db: Session, user_id: int, talk_id: int):
+        """Queue a like toggle; returns ``(liked, like_count)`` or None if the talk doesn't exist."""
+        with self._stored_state(db, user_id, talk_id) as state:
+            if state is None:
+                return None
+            group_id, like_count, stored = state
+            key = (user_id, group_id)
+            pending = self._pending.get(key)
+            flushing = self._flushing.get(key)
+            if pending is not None:
+                stored = pending[2]
+                liked = not pending[0]
+                self._shift(self._pending_delta, group_id, int(stored) - int(pending[0]))
+            elif flushing is not None:
+                # The database will hold the in-flight state once that batch commits
+                stored = flushing[0]
+                liked = not flushing[0]
+            else:
+                liked = not stored
+
+            if liked == stored:
+                self._pending.pop(key, None)
+            else:
+                self._pending[key] = (liked, talk_id, stored, datetime.utcnow())
+                self._shift(self._pending_delta, group_id, int(liked) - int(stored))
+            like_count += self._group_delta(group_id)
+            if len(self._pending) >= self.max_events:
+                self._wake.set()
+        return liked, like_count
+
+    def flush(self) -> int:
+        """Write the queued toggles in one transaction; returns how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._flushing, self._pending = self._pending, {}
+                self._flushing_delta, self._pending_delta = self._pending_delta, Counter()
+                batch = self._flushing
+
+            db = self.session_factory()
+            try:
+                changed = Counter()
+                # Users may have deleted their account since tapping
+                users = {
+                    user_id for (user_id,) in
+                    db.query(models.User.id).filter(models.User.id.in_({user_id for user_id, _ in batch}))
+                }
+                likes = [
+                    {"user_id": user_id, "group_id": group_id, "talk_id": talk_id, "created_at": tapped_at}
+                    for (user_id, group_id), (liked, talk_id, _, tapped_at) in batch.items()
+                    if liked and user_id in users
+                ]
+                unlikes = [key for key, entry in batch.items() if not entry[0]]
+
+                table = models.TalkLike.__table__
+                if likes:
+                    stmt = postgresql.insert(table).values(likes).on_conflict_do_nothing().returning(table.c.group_id)
+                    for (group_id,) in db.execute(stmt):
+                        changed[group_id] += 1
+                if unlikes:
+                    stmt = table.delete().where(
+                        tuple_(table.c.user_id, table.c.group_id).in_(unlikes)
+                    ).returning(table.c.group_id)
+                    for (group_id,) in db.execute(stmt):
+                        changed[group_id] -= 1
+
+                for group_id, delta in changed.items():
+                    if delta:
+                        adjust_talk_like_count(db, group_id, delta)
+                # Readers must never see the committed counters and the
+                # in-flight batch at once
+                with self._lock:
+                    db.commit()
+                    self._flushing, self._flushing_delta = {}, Counter()
+                    self._generation += 1
+                return len(batch)
+            except Exception:
+                db.rollback()
+                logging.exception("Failed to flush %d buffered likes, will retry", len(batch))
+                with self._lock:
+                    # Newer toggles on the same key win over the failed batch,
+                    # but the database still holds what that batch started from
+                    for key, entry in batch.items():
+                        newer = self._pending.get(key)
+                        if newer is None:
+                            self._pending[key] = entry
+                        elif newer[0] == entry[2]:
+                            del self._pending[key]
+                        else:
+                            self._pending[key] = (newer[0], newer[1], entry[2], newer[3])
+                    for group_id, delta in self._flushing_delta.items():
+                        self._shift(self._pending_delta, group_id, delta)
+                    self._flushing, self._flushing_delta = {}, Counter()
+                return 0
+            finally:
+                db.close()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="like-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write whatever is still queued."""
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+like_buffer = LikeBuffer()
@@ -0,0 +1,156 @@
+# app/like_counters.py
+
+from datetime import datetime
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+def _upsert(db: Session, table):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def adjust_talk_like_count(db: Session, group_id: int, delta: int):
+    """Add ``delta`` to a group's like counter in the caller's transaction."""
+    stats = models.TalkGroupStats.__table__
+    stmt = _upsert(db, stats).values(group_id=group_id, like_count=max(delta, 0))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[stats.c.group_id],
+        set_={"like_count": stats.c.like_count + delta},
+    )
+    db.execute(stmt)
+
+
+# Each toggle direction is one statement: the like row and the group counter
+# change together, and a concurrent double tap can't hit the unique constraints.
+# ON CONFLICT without a target covers both the per-talk and per-group like.
+LIKE_TALK = text("""
+    WITH liked AS (
+        INSERT INTO talk_likes (user_id, talk_id, group_id, created_at, ingested_at)
+        SELECT :user_id, talks.id, talks.group_id, :now, :now FROM talks
+        WHERE talks.id = :talk_id AND talks.deleted_at IS NULL
+        ON CONFLICT DO NOTHING
+        RETURNING group_id
+    )
+    INSERT INTO talk_group_stats (group_id, like_count)
+    SELECT group_id, 1 FROM liked
+    ON CONFLICT (group_id) DO UPDATE SET like_count = talk_group_stats.like_count + 1
+    RETURNING like_count
+""")
+
+UNLIKE_TALK = text("""
+    WITH unliked AS (
+        DELETE FROM talk_likes
+        WHERE user_id = :user_id AND group_id = (SELECT group_id FROM talks WHERE id = :talk_id)
+        RETURNING group_id
+    )
+    INSERT INTO talk_group_stats (group_id, like_count)
+    SELECT group_id, 0 FROM unliked
+    ON CONFLICT (group_id) DO UPDATE SET like_count = talk_group_stats.like_count - 1
+    RETURNING like_count
+""")
+
+# Tools have no counter table; the count subquery reads the snapshot from
+# before the insert or delete, hence the +1 / -1
+LIKE_TOOL = text("""
+    WITH liked AS (
+        INSERT INTO tool_likes (user_id, tool_id, created_at)
+        SELECT :user_id, tools.id, :now FROM tools
+        WHERE tools.id = :tool_id AND tools.deleted_at IS NULL
+        ON CONFLICT DO NOTHING
+        RETURNING tool_id
+    )
+    SELECT (SELECT count(*) FROM tool_likes WHERE tool_id = :tool_id) + 1 FROM liked
+""")
+
+UNLIKE_TOOL = text("""
+    WITH unliked AS (
+        DELETE FROM tool_likes WHERE user_id = :user_id AND tool_id = :tool_id
+        RETURNING tool_id
+    )
+    SELECT (SELECT count(*) FROM tool_likes WHERE tool_id = :tool_id) - 1 FROM unliked
+""")
+
+
+def toggle_talk_like(db: Session, user_id: int, talk_id: int):
+    """Like the talk's group for ``user_id``, or unlike it if already liked.
+
+    Returns ``(liked, like_count)``, or None if the talk doesn't exist.
+    """
+    params = {"user_id": user_id, "talk_id": talk_id, "now": datetime.utcnow()}
+    count = db.execute(LIKE_TALK, params).scalar()
+    if count is not None:
+        return True, count
+    count = db.execute(UNLIKE_TALK, params).scalar()
+    if count is not None:
+        return False, count
+
+    # Neither matched: no such talk, or a concurrent unlike got there first
+    group_id = db.query(models.Talk.group_id).filter(models.Talk.id == talk_id).scalar()
+    if group_id is None:
+        return None
+    return False, get_talk_like_count(db, group_id)
+
+
+def toggle_tool_like(db: Session, user_id: int, tool_id: int):
+    """Like the tool for ``user_id``, or unlike it if already liked.
+
+    Returns ``(liked, like_count)``, or None if the tool doesn't exist.
+    """
+    params = {"user_id": user_id, "tool_id": tool_id, "now": datetime.utcnow()}
+    count = db.execute(LIKE_TOOL, params).scalar()
+    if count is not None:
+        return True, count
+    count = db.execute(UNLIKE_TOOL, params).scalar()
+    if count is not None:
+        return False, count
+
+    if db.query(models.Tool.id).filter(models.Tool.id == tool_id).first() is None:
+        return None
+    return False, db.query(func.count(models.ToolLike.id)).filter(models.ToolLike.tool_id == tool_id).scalar()
+
+
+def get_talk_like_count(db: Session, group_id: int) -> int:
+    count = db.query(models.TalkGroupStats.like_count).filter(
+        models.TalkGroupStats.group_id == group_id
+    ).scalar()
+    return count or 0
+
+
+def release_user_talk_likes(db: Session, user_id: int):
+    """Decrement the counters for every like ``user_id`` is about to lose."""
+    rows = db.query(models.TalkLike.group_id, func.count(models.TalkLike.id)).filter(
+        models.TalkLike.user_id == user_id
+    ).group_by(models.TalkLike.group_id).all()
+    for group_id, count in rows:
+        adjust_talk_like_count(db, group_id, -count)
+
+
+def rebuild_talk_group_stats(db: Session) -> int:
+    """Recompute every counter from talk_likes; groups without likes get 0.
+
+    Likes are locked against writes until the caller's transaction ends, so
+    no like can slip in between the count and the rewrite of the counters.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE talk_likes IN SHARE MODE"))
+    counts = db.query(
+        models.TalkGroup.id,
+        func.count(models.TalkLike.id)
+    ).outerjoin(
+        models.TalkLike, models.TalkLike.group_id == models.TalkGroup.id
+    ).filter(
+        models.TalkGroup.kind == "talk"
+    ).group_by(models.TalkGroup.id).all()
+
+    db.query(models.TalkGroupStats).delete(synchronize_session=False)
+    db.bulk_insert_mappings(models.TalkGroupStats, [
+        {"group_id": group_id, "like_count": like_count}
+        for group_id, like_count in counts
+    ])
+    return len(counts)
@@ -1,16 +1,39 @@
 # app/main.py
 
-from fastapi import FastAPI
+import hmac
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app.compression import CompressionMiddleware
 from fastapi.staticfiles import StaticFiles
-from app.routes import auth, talks, history, tickets, profile, leads, tools, device_tokens
+from app.database import engine
+from app.migrations import upgrade
+from app.like_buffer import like_buffer
+from app.metrics import metrics
+from app.passwords import PasswordHashingBusy
+from app.routes import auth, talks, history, tickets, profile, leads, tools, device_tokens, catalog, sync
 from dotenv import load_dotenv
 import os
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+# Bring the schema up to date before serving
+upgrade(engine)
+
+# Bearer token for GET /metrics; the endpoint doesn't exist without one
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@asynccontextmanager
+async def lifespan(app):
+    if like_buffer.enabled:
+        like_buffer.start()
+    yield
+    # Graceful shutdown: write buffered likes before the worker exits
+    like_buffer.stop()
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 app.add_middleware(
@@ -20,6 +43,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy(request: Request, exc: PasswordHashingBusy):
+    # Shed sign-in load early instead of letting it queue behind bcrypt
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in requests, please try again shortly"},
+        headers={"Retry-After": "1"},
+    )
 
 # Register the auth router
 app.include_router(auth.router)
@@ -30,8 +63,23 @@ app.include_router(profile.router)
 app.include_router(leads.router, prefix="/api", tags=["leads"])
 app.include_router(tools.router)
 app.include_router(device_tokens.router)
+app.include_router(catalog.router)
+app.include_router(sync.router)
 
 
 @app.get("/")
 def home():
     return {"message": "SafetyNow App Backend running!"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {METRICS_TOKEN}".encode()
+    if not hmac.compare_digest(request.headers.get("authorization", "").encode(), expected):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    # This worker's numbers only
+    snapshot = metrics.snapshot()
+    snapshot["jwt_cache_hit_rate"] = metrics.ratio("jwt.cache_hits", "jwt.cache_misses")
+    return snapshot
@@ -0,0 +1,73 @@
+# app/metrics.py
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Process-local counters, gauges and timings, reported by ``GET /metrics``.
+
+    Each worker process keeps its own; scrape every worker or sum them.
+    """
+
+    def __init__(self):
+        self._counters = Counter()
+        self._gauges = {}
+        # name -> [count, total seconds, max seconds]
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            timing = self._timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def ratio(self, name: str, other: str):
+        """``name / (name + other)``, or None before either has been counted."""
+        with self._lock:
+            total = self._counters[name] + self._counters[other]
+            return self._counters[name] / total if total else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": {
+                    name: {
+                        "count": count,
+                        "avg_ms": round(total / count * 1000, 3),
+                        "max_ms": round(longest * 1000, 3),
+                    }
+                    for name, (count, total, longest) in self._timings.items()
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
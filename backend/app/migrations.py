@@ -0,0 +1,177 @@
+# app/migrations.py
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, text
+
+from app import models
+from app.search import create_search_indexes
+from app.talk_groups import backfill_talk_groups
+from app.view_log import ensure_view_partitions
+
+# Arbitrary key so that concurrently starting workers migrate one at a time
+MIGRATION_LOCK_ID = 7293841
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def create_baseline(conn):
+    models.Base.metadata.create_all(bind=conn)
+
+
+def add_sync_columns(conn):
+    for table in ("talks", "tools"):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE"))
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITHOUT TIME ZONE"))
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS catalog_version INTEGER NOT NULL DEFAULT 0"))
+    create_model_indexes("ix_talks_catalog_version", "ix_tools_catalog_version")(conn)
+
+
+def create_trending_rollups(conn):
+    for model in (models.TalkActivityHourly, models.RollupWatermark):
+        model.__table__.create(bind=conn, checkfirst=True)
+    create_model_indexes("ix_talk_likes_created_at", "ix_talk_history_accessed_at")(conn)
+
+
+def unique_talk_history(conn):
+    # Keep the most recent row of each (user, talk, language)
+    conn.execute(text(
+        "DELETE FROM talk_history WHERE id IN ("
+        " SELECT id FROM ("
+        "  SELECT id, row_number() OVER ("
+        "   PARTITION BY user_id, talk_title, language ORDER BY accessed_at DESC NULLS LAST, id DESC"
+        "  ) AS position FROM talk_history"
+        " ) ranked WHERE position > 1"
+        ")"
+    ))
+    exists = conn.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = 'unique_user_talk_history'")
+    ).first()
+    if not exists:
+        conn.execute(text(
+            "ALTER TABLE talk_history ADD CONSTRAINT unique_user_talk_history UNIQUE (user_id, talk_title, language)"
+        ))
+
+
+def create_view_log(conn):
+    models.TalkView.__table__.create(bind=conn, checkfirst=True)
+    # Seed the log with the last view of each history entry
+    earliest = conn.execute(text("SELECT min(accessed_at) FROM talk_history")).scalar()
+    ensure_view_partitions(conn, since=earliest.date() if earliest else None)
+    conn.execute(text(
+        "INSERT INTO talk_views (user_id, talk_title, language, viewed_at)"
+        " SELECT user_id, talk_title, language, accessed_at FROM talk_history"
+        " WHERE user_id IS NOT NULL AND talk_title IS NOT NULL AND accessed_at IS NOT NULL"
+    ))
+    # The views rollup reads talk_views now
+    conn.execute(text("DROP INDEX IF EXISTS ix_talk_history_accessed_at"))
+
+
+def create_talk_cooccurrences(conn):
+    models.TalkCooccurrence.__table__.create(bind=conn, checkfirst=True)
+
+
+def add_ingestion_times(conn):
+    for table, happened_at in (("talk_views", "viewed_at"), ("talk_likes", "created_at")):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS ingested_at TIMESTAMP WITHOUT TIME ZONE"))
+        # The rollup watermarks have so far followed the event times, so
+        # existing rows count as ingested when they happened
+        conn.execute(text(f"UPDATE {table} SET ingested_at = {happened_at} WHERE ingested_at IS NULL"))
+    create_model_indexes(
+        "ix_talk_views_ingested_at",
+        "ix_talk_views_user_id_viewed_at",
+        "ix_talk_likes_ingested_at",
+        replaces=("ix_talk_views_viewed_at", "ix_talk_likes_created_at"),
+    )(conn)
+
+
+def create_model_indexes(*names, replaces=()):
+    """Create indexes declared on the models that an older database lacks.
+
+    ``replaces`` names indexes made redundant by the new ones.
+    """
+    def upgrade(conn):
+        indexes = {
+            index.name: index
+            for table in models.Base.metadata.tables.values()
+            for index in table.indexes
+        }
+        for name in names:
+            # No longer declared: a later migration replaces it
+            if name not in indexes:
+                continue
+            exists = conn.execute(
+                text("SELECT 1 FROM pg_indexes WHERE indexname = :name"), {"name": name}
+            ).first()
+            if not exists:
+                indexes[name].create(bind=conn)
+        for name in replaces:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    return upgrade
+
+
+# (version, name, upgrade, postgresql_only). Never edit or reorder an applied
+# entry; append a new one. On other dialects the baseline already builds the
+# current schema, so the Postgres-only steps are just recorded.
+MIGRATIONS = [
+    (1, "baseline", create_baseline, False),
+    (2, "search_indexes", create_search_indexes, True),
+    (3, "talk_groups", backfill_talk_groups, True),
+    (4, "hot_path_indexes", create_model_indexes(
+        "ix_talks_language_id",
+        "ix_talks_hazard_language_id",
+        "ix_talks_industry_language_id",
+        "ix_talks_related_title",
+        "ix_talk_history_user_id_accessed_at",
+        "ix_tickets_user_id",
+        "ix_talk_likes_talk_id",
+        "ix_talk_likes_group_id",
+        "ix_tool_likes_tool_id",
+        "ix_password_resets_email_is_used_expires_at",
+        replaces=("ix_password_resets_email",),
+    ), True),
+    (5, "catalog_sync", add_sync_columns, True),
+    (6, "trending_rollups", create_trending_rollups, True),
+    (7, "unique_talk_history", unique_talk_history, True),
+    (8, "history_keyset_index", create_model_indexes(
+        "ix_talk_history_user_id_accessed_at_id",
+        replaces=("ix_talk_history_user_id_accessed_at",),
+    ), True),
+    (9, "talk_view_log", create_view_log, True),
+    (10, "talk_cooccurrences", create_talk_cooccurrences, True),
+    (11, "ingestion_times", add_ingestion_times, True),
+]
+
+
+def applied_versions(conn):
+    return {row[0] for row in conn.execute(schema_migrations.select().with_only_columns([schema_migrations.c.version]))}
+
+
+def upgrade(engine):
+    """Apply pending migrations in one transaction and return their versions."""
+    applied = []
+    with engine.begin() as conn:
+        postgres = conn.dialect.name == "postgresql"
+        if postgres:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        schema_migrations.create(bind=conn, checkfirst=True)
+        done = applied_versions(conn)
+
+        for version, name, migrate, postgresql_only in MIGRATIONS:
+            if version in done:
+                continue
+            if postgres or not postgresql_only:
+                migrate(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version, name=name, applied_at=datetime.utcnow()
+            ))
+            applied.append(version)
+    return applied
@@ -1,11 +1,12 @@
 # app/models.py
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import relationship, Session, with_loader_criteria
 from app.database import Base
 from sqlalchemy import DateTime
 from datetime import datetime
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, Index
 
 class User(Base):
     __tablename__ = "users"
@@ -27,6 +28,35 @@ class TalkHistory(Base):
     accessed_at = Column(DateTime, default=datetime.utcnow)
     language = Column(String, nullable=False, default="en")
 
+    __table_args__ = (
+        Index("ix_talk_history_user_id_accessed_at_id", "user_id", accessed_at.desc(), id.desc()),
+        # One row per talk a user has opened; re-opening moves accessed_at
+        UniqueConstraint('user_id', 'talk_title', 'language', name='unique_user_talk_history'),
+    )
+
+
+class TalkView(Base):
+    __tablename__ = "talk_views"
+
+    # Append-only log of every talk opened. On Postgres it is range
+    # partitioned by month (see app.view_log). It has no key in the database,
+    # so inserts only maintain the two indexes below; the mapper's key is for
+    # ORM reads.
+    user_id = Column(Integer, nullable=False)
+    talk_title = Column(String, nullable=False)
+    language = Column(String, nullable=False)
+    viewed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # When the server logged the view. Offline views arrive long after they
+    # happened, so the rollups find new rows by this instead of viewed_at.
+    ingested_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_talk_views_ingested_at", "ingested_at"),
+        Index("ix_talk_views_user_id_viewed_at", "user_id", "viewed_at"),
+        {"postgresql_partition_by": "RANGE (viewed_at)"},
+    )
+    __mapper_args__ = {"primary_key": [user_id, talk_title, language, viewed_at]}
+
 
 class Ticket(Base):
     __tablename__ = "tickets"
@@ -37,7 +67,20 @@ class Ticket(Base):
     phone = Column(String)
     topic = Column(String)
     message = Column(String)
-    user_id = Column(Integer)
+    user_id = Column(Integer, index=True)
+
+
+class TalkGroup(Base):
+    __tablename__ = "talk_groups"
+
+    # All translations of a talk (or tool) share one group
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    related_title = Column(String, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('kind', 'related_title', name='unique_group_kind_related_title'),
+    )
 
 
 class Talk(Base):
@@ -50,9 +93,23 @@ class Talk(Base):
     industry = Column(String, nullable=True)
     language = Column(String, nullable=False, default="en")
     related_title = Column(String, nullable=False)
+    group_id = Column(Integer, ForeignKey("talk_groups.id"), nullable=False, index=True)
+    # Delta sync: the catalog version that last wrote the row, and tombstones
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)
+    catalog_version = Column(Integer, nullable=False, default=0, index=True)
     
     # Relationship with likes
     likes = relationship("TalkLike", back_populates="talk")
+    group = relationship("TalkGroup")
+
+    # Catalog filters, each ending in id so keyset pages are index range scans
+    __table_args__ = (
+        Index("ix_talks_language_id", "language", "id"),
+        Index("ix_talks_hazard_language_id", "hazard", "language", "id"),
+        Index("ix_talks_industry_language_id", "industry", "language", "id"),
+        Index("ix_talks_related_title", "related_title"),
+    )
     
     @property
     def like_count(self):
@@ -65,7 +122,11 @@ class TalkLike(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     talk_id = Column(Integer, ForeignKey("talks.id"), nullable=False)
+    # A like counts for every translation in the talk's group
+    group_id = Column(Integer, ForeignKey("talk_groups.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Buffered likes are written after they were tapped; see TalkView.ingested_at
+    ingested_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     talk = relationship("Talk", back_populates="likes")
@@ -73,9 +134,58 @@ class TalkLike(Base):
     
     __table_args__ = (
         UniqueConstraint('user_id', 'talk_id', name='unique_user_talk_like'),
+        UniqueConstraint('user_id', 'group_id', name='unique_user_talk_group_like'),
+        Index("ix_talk_likes_talk_id", "talk_id"),
+        Index("ix_talk_likes_group_id", "group_id"),
+        Index("ix_talk_likes_ingested_at", "ingested_at"),
+    )
+
+
+class TalkGroupStats(Base):
+    __tablename__ = "talk_group_stats"
+
+    # One row per translation group, maintained alongside talk_likes
+    group_id = Column(Integer, ForeignKey("talk_groups.id"), primary_key=True)
+    like_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_talk_group_stats_like_count", like_count.desc()),
     )
 
 
+class TalkActivityHourly(Base):
+    __tablename__ = "talk_activity_hourly"
+
+    # Likes and views per translation group and hour, rolled up from
+    # talk_likes and talk_views by app.trending
+    group_id = Column(Integer, ForeignKey("talk_groups.id"), primary_key=True)
+    hour = Column(DateTime, primary_key=True)
+    likes = Column(Integer, nullable=False, default=0)
+    views = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_talk_activity_hourly_hour", "hour"),
+    )
+
+
+class TalkCooccurrence(Base):
+    __tablename__ = "talk_cooccurrences"
+
+    # How often two translation groups were opened in the same session, kept
+    # for each group's top related groups only; maintained by app.related_talks
+    group_id = Column(Integer, ForeignKey("talk_groups.id"), primary_key=True)
+    related_group_id = Column(Integer, ForeignKey("talk_groups.id"), primary_key=True)
+    co_views = Column(Integer, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+
+    # Events up to rolled_up_to have been folded into the rollup table
+    name = Column(String, primary_key=True)
+    rolled_up_to = Column(DateTime, nullable=False)
+
+
 class Tool(Base):
     __tablename__ = "tools"
     id = Column(Integer, primary_key=True, index=True)
@@ -86,9 +196,15 @@ class Tool(Base):
     industry = Column(String, nullable=True)
     language = Column(String, nullable=False, default="en")
     related_title = Column(String, nullable=False)
+    group_id = Column(Integer, ForeignKey("talk_groups.id"), nullable=False, index=True)
+    # Delta sync: the catalog version that last wrote the row, and tombstones
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)
+    catalog_version = Column(Integer, nullable=False, default=0, index=True)
     
     # Relationship with likes
     likes = relationship("ToolLike", back_populates="tool")
+    group = relationship("TalkGroup")
     
     @property
     def like_count(self):
@@ -109,6 +225,7 @@ class ToolLike(Base):
     
     __table_args__ = (
         UniqueConstraint('user_id', 'tool_id', name='unique_user_tool_like'),
+        Index("ix_tool_likes_tool_id", "tool_id"),
     )
 
 
@@ -116,8 +233,65 @@ class PasswordReset(Base):
     __tablename__ = "password_resets"
 
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, index=True)
+    email = Column(String)
     code = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     expires_at = Column(DateTime)
     is_used = Column(Boolean, default=False)
+
+    __table_args__ = (
+        Index("ix_password_resets_email_is_used_expires_at", "email", "is_used", "expires_at"),
+    )
+
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_version"
+
+    # Single row (id=1) bumped by ingestion whenever talks or tools change
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+GROUP_KINDS = {Talk: "talk", Tool: "tool"}
+
+
+@event.listens_for(Session, "before_flush")
+def assign_translation_groups(session, flush_context, instances):
+    # Resolve related_title to a TalkGroup for new or retitled talks and tools
+    groups = {}
+    for obj in list(session.new) + list(session.dirty):
+        kind = GROUP_KINDS.get(type(obj))
+        if kind is None:
+            continue
+        if obj in session.new:
+            if obj.group_id is not None or obj.group is not None:
+                continue
+        elif not inspect(obj).attrs.related_title.history.has_changes():
+            continue
+
+        key = (kind, obj.related_title)
+        if key not in groups:
+            with session.no_autoflush:
+                group = session.query(TalkGroup).filter_by(kind=kind, related_title=obj.related_title).first()
+            if group is None:
+                group = TalkGroup(kind=kind, related_title=obj.related_title)
+                session.add(group)
+            groups[key] = group
+        obj.group = groups[key]
+
+
+@event.listens_for(Session, "do_orm_execute")
+def hide_deleted_catalog_rows(execute_state):
+    # Soft-deleted talks and tools only stay around as sync tombstones; pass
+    # execution_options(include_deleted=True) to see them
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get("include_deleted", False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(Talk, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+            with_loader_criteria(Tool, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+        )
@@ -1,11 +1,13 @@
 import pandas as pd
-from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine
-from app.models import Base, Tool
+from app.models import Tool
+from app.migrations import upgrade
+from app.cache import bump_catalog_version
+from app.catalog_bundles import build_catalog_bundles
 import os
 
 def parse_and_upload_tools():
-    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
     
     excel_file = "Tools.xlsx" 
     if not os.path.exists(excel_file):
@@ -31,8 +33,10 @@ def parse_and_upload_tools():
             
             db.add(tool)
         
+        bump_catalog_version(db)
         db.commit()
         print("Successfully uploaded all tools to the database!")
+        build_catalog_bundles(db)
         
     except Exception as e:
         print(f"Error occurred: {str(e)}")
@@ -0,0 +1,76 @@
+# app/passwords.py
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from app.metrics import metrics
+
+# Changing the cost rehashes each user's password at their next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Hashes waiting or running before new requests are turned away
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class PasswordHashingBusy(Exception):
+    """Too many passwords are waiting to be hashed; answered with 503."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool.
+
+    A burst of logins then queues here instead of occupying the threads that
+    serve every other endpoint. Once ``max_pending`` calls are waiting or
+    running, further calls fail fast with PasswordHashingBusy rather than
+    queueing for longer than a client would wait.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _set_pending(self, delta: int):
+        self._pending += delta
+        metrics.set_gauge("passwords.pending", self._pending)
+
+    async def _run(self, name: str, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                metrics.increment("passwords.rejected")
+                raise PasswordHashingBusy()
+            self._set_pending(1)
+        queued_at = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            metrics.observe("passwords.queue_wait", started - queued_at)
+            try:
+                return fn(*args)
+            finally:
+                metrics.observe(f"passwords.{name}", time.perf_counter() - started)
+
+        try:
+            return await asyncio.wrap_future(self._executor.submit(task))
+        finally:
+            with self._lock:
+                self._set_pending(-1)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str):
+        """``(valid, new_hash)``; new_hash is set when the stored hash uses
+        outdated settings and should replace it."""
+        return await self._run("verify", pwd_context.verify_and_update, password, hashed)
+
+
+password_hasher = PasswordHasher()
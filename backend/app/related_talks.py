@@ -0,0 +1,114 @@
+# app/related_talks.py
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session, aliased
+
+from app import models
+from app.serialization import catalog_columns, catalog_row
+from app.trending import ROLLUP_LAG, lock_watermark, oldest_new_view
+
+# Views by one user this close together belong to the same session
+RELATED_SESSION_GAP = timedelta(minutes=int(os.getenv("RELATED_SESSION_GAP_MINUTES", "30")))
+# Related groups kept per group; more than the endpoint serves, so that a
+# pair just below the cut has room to climb back
+RELATED_TALKS_KEEP = int(os.getenv("RELATED_TALKS_KEEP", "50"))
+MAX_RELATED_TALKS = 20
+WATERMARK = "talk_cooccurrences"
+
+# Pairs each newly ingested view with the same user's views within the
+# session gap either side of it. Offline views are ingested late, so every
+# pair is counted once, when the second of its views is ingested, and a user
+# adds at most one per pair and run. The other view is found on the
+# (user_id, viewed_at) index. The :oldest bounds keep both scans on recent
+# partitions; see ROLL_UP_VIEWS.
+ROLL_UP_PAIRS = text("""
+    WITH new_views AS (
+        SELECT talk_views.user_id, talks.group_id, talk_views.viewed_at
+        FROM talk_views
+        JOIN talks ON talks.title = talk_views.talk_title AND talks.language = talk_views.language
+        WHERE talk_views.ingested_at > :since AND talk_views.ingested_at <= :until
+            AND talk_views.viewed_at >= :oldest
+    ), pairs AS (
+        SELECT new_views.user_id, new_views.group_id AS a, talks.group_id AS b
+        FROM new_views
+        JOIN talk_views other ON other.user_id = new_views.user_id
+            AND other.viewed_at BETWEEN new_views.viewed_at - :gap AND new_views.viewed_at + :gap
+        JOIN talks ON talks.title = other.talk_title AND talks.language = other.language
+        WHERE other.ingested_at <= :until AND other.viewed_at >= CAST(:oldest AS timestamp) - :gap
+            AND talks.group_id <> new_views.group_id
+    )
+    INSERT INTO talk_cooccurrences (group_id, related_group_id, co_views)
+    SELECT a, b, count(DISTINCT user_id)
+    FROM (SELECT user_id, a, b FROM pairs UNION ALL SELECT user_id, b, a FROM pairs) both_ways
+    GROUP BY a, b
+    ON CONFLICT (group_id, related_group_id)
+    DO UPDATE SET co_views = talk_cooccurrences.co_views + EXCLUDED.co_views
+    RETURNING group_id
+""")
+
+PRUNE_PAIRS = text("""
+    DELETE FROM talk_cooccurrences
+    WHERE (group_id, related_group_id) IN (
+        SELECT group_id, related_group_id FROM (
+            SELECT group_id, related_group_id, row_number() OVER (
+                PARTITION BY group_id ORDER BY co_views DESC, related_group_id
+            ) AS position
+            FROM talk_cooccurrences
+            WHERE group_id = ANY(:groups)
+        ) ranked
+        WHERE position > :keep
+    )
+""")
+
+
+def update_related_talks(db: Session, until: datetime = None):
+    """Fold views since the last run into talk_cooccurrences and trim the
+    groups they touched back to their top ``RELATED_TALKS_KEEP``.
+
+    Runs in the caller's transaction and returns the ``(since, until)`` range
+    it covered.
+    """
+    until = until or datetime.utcnow() - ROLLUP_LAG
+    watermark = lock_watermark(db, WATERMARK)
+    since = watermark.rolled_up_to
+    if until <= since:
+        return since, since
+
+    touched = {
+        group_id for (group_id,) in
+        db.execute(ROLL_UP_PAIRS, {
+            "since": since, "until": until, "oldest": oldest_new_view(since), "gap": RELATED_SESSION_GAP
+        })
+    }
+    if touched:
+        db.execute(PRUNE_PAIRS, {"groups": sorted(touched), "keep": RELATED_TALKS_KEEP})
+    watermark.rolled_up_to = until
+    db.flush()
+    return since, until
+
+
+def related_talks(db: Session, talk_id: int, limit: int):
+    """Talks in the same language most often opened alongside ``talk_id``,
+    or None if the talk doesn't exist."""
+    source = aliased(models.Talk)
+    pairs = models.TalkCooccurrence
+    rows = db.query(*catalog_columns(models.Talk), pairs.co_views).join(
+        pairs, pairs.related_group_id == models.Talk.group_id
+    ).join(
+        source, source.group_id == pairs.group_id
+    ).filter(
+        source.id == talk_id,
+        models.Talk.language == source.language
+    ).order_by(pairs.co_views.desc(), models.Talk.id).limit(limit).all()
+
+    if not rows and db.query(models.Talk.id).filter(models.Talk.id == talk_id).first() is None:
+        return None
+    result = []
+    for row in rows:
+        talk = catalog_row(row[:-1])
+        talk["co_views"] = row[-1]
+        result.append(talk)
+    return result
@@ -1,33 +1,30 @@
 # app/routes/auth.py
 from fastapi import status
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app import models, schemas
-from app.database import SessionLocal, engine
-from app.jwt_token import create_access_token, verify_access_token
+from app.database import SessionLocal
+from app.jwt_token import create_access_token
+from app.dependencies import get_current_user_id, invalidate_principal
 from app.routes.tickets import get_access_token
+from app.like_counters import release_user_talk_likes
+from app.passwords import password_hasher, pwd_context
 from pydantic import BaseModel
 import boto3
 import os
 
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 import random
 import string
 import requests
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
-
 router = APIRouter(
     prefix="/auth",
     tags=["auth"]
 )
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
-
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -36,29 +33,7 @@ def get_db():
     finally:
         db.close()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        payload = verify_access_token(token)
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise credentials_exception
-    except:
-        raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-        
-    return user
-
-@router.post("/register", response_model=schemas.UserOut)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+def check_registration(db: Session, user: schemas.UserCreate):
     db_email = db.query(models.User).filter(models.User.email == user.email).first()
     if db_email:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -67,12 +42,9 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
 
-    username = user.username.lower()
-
-    # Create user
-    hashed_password = pwd_context.hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
     new_user = models.User(
-        username=username,
+        username=user.username.lower(),
         email=user.email,
         phone=user.phone,
         hashed_password=hashed_password
@@ -80,21 +52,33 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
-
     return new_user
 
+# Register, login and reset-password are async so that waiting on bcrypt
+# doesn't hold a threadpool thread; their queries run in the threadpool and
+# the hashing on app.passwords' own executor.
+
+@router.post("/register", response_model=schemas.UserOut)
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    await run_in_threadpool(check_registration, db, user)
+    hashed_password = await password_hasher.hash(user.password)
+    return await run_in_threadpool(create_user, db, user, hashed_password)
+
+def find_user_by_username(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
 @router.post("/login")
-def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.username == user_credentials.username).first()
+async def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(find_user_by_username, db, user_credentials.username)
     if not user:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials")
     
-    if not pwd_context.verify(user_credentials.password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(user_credentials.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials")
     
     access_token = create_access_token(data={"user_id": user.id})
-
-    return {"access_token": access_token, 
+    response = {"access_token": access_token, 
             "token_type": "bearer", 
             "user": {
                 "id": user.id,
@@ -105,6 +89,13 @@ def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session =
             }
     }
 
+    # Hashed with an older BCRYPT_ROUNDS; store it at the current cost
+    if new_hash:
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
+
+    return response
+
 def generate_reset_code():
     return ''.join(random.choices(string.digits, k=6))
 
@@ -207,8 +198,7 @@ def verify_reset_code(request: schemas.PasswordResetVerify, db: Session = Depend
 
     return {"message": "Code verified successfully"}
 
-@router.post("/reset-password")
-def reset_password(request: schemas.PasswordReset, db: Session = Depends(get_db)):
+def find_password_reset(db: Session, request: schemas.PasswordReset):
     reset_request = db.query(models.PasswordReset)\
         .filter(models.PasswordReset.email == request.email)\
         .filter(models.PasswordReset.is_used == False)\
@@ -226,10 +216,21 @@ def reset_password(request: schemas.PasswordReset, db: Session = Depends(get_db)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.hashed_password = pwd_context.hash(request.new_password)
+    return reset_request, user
+
+def save_password(db: Session, reset_request: models.PasswordReset, user: models.User, hashed_password: str):
+    user.hashed_password = hashed_password
     reset_request.is_used = True
     db.commit()
 
+@router.post("/reset-password")
+async def reset_password(request: schemas.PasswordReset, db: Session = Depends(get_db)):
+    reset_request, user = await run_in_threadpool(find_password_reset, db, request)
+    user_id = user.id
+    hashed_password = await password_hasher.hash(request.new_password)
+    await run_in_threadpool(save_password, db, reset_request, user, hashed_password)
+    invalidate_principal(user_id)
+
     return {"message": "Password reset successful"}
 
 class DeleteAccountRequest(BaseModel):
@@ -239,8 +240,12 @@ class DeleteAccountRequest(BaseModel):
 def delete_account(
     request: DeleteAccountRequest,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    user_id: int = Depends(get_current_user_id)
 ):
+    current_user = db.query(models.User).filter(models.User.id == user_id).first()
+    if current_user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+
     # Verify password
     if not pwd_context.verify(request.password, current_user.hashed_password):
         raise HTTPException(
@@ -263,8 +268,10 @@ def delete_account(
     
     # Delete user's history
     db.query(models.TalkHistory).filter(models.TalkHistory.user_id == current_user.id).delete()
+    db.query(models.TalkView).filter(models.TalkView.user_id == current_user.id).delete()
     
     # Delete user's likes
+    release_user_talk_likes(db, current_user.id)
     db.query(models.TalkLike).filter(models.TalkLike.user_id == current_user.id).delete()
     db.query(models.ToolLike).filter(models.ToolLike.user_id == current_user.id).delete()
     
@@ -274,5 +281,6 @@ def delete_account(
     # Finally, delete the user
     db.delete(current_user)
     db.commit()
+    invalidate_principal(user_id)
     
     return {"message": "Account deleted successfully"}
\ No newline at end of file
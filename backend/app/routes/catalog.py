@@ -0,0 +1,73 @@
+import gzip
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, RedirectResponse
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.jwt_token import verify_access_token
+from app import catalog_bundles
+from app.compression import accepted_encodings
+
+router = APIRouter(
+    prefix="/catalog",
+    tags=["catalog"]
+)
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    payload = verify_access_token(token)
+    if payload is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return payload["user_id"]
+
+@router.get("/{language}")
+def get_catalog_bundle_url(
+    language: str,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    manifest = catalog_bundles.current_manifest(db)
+    digest = manifest["bundles"].get(language)
+    if digest is None:
+        raise HTTPException(status_code=404, detail="No catalog for this language")
+    # The redirect itself must not be cached: it moves on every catalog change
+    return RedirectResponse(
+        url=f"/catalog/{language}/{digest}",
+        status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@router.get("/{language}/{digest}")
+def get_catalog_bundle(
+    language: str,
+    digest: str,
+    request: Request,
+    current_user = Depends(get_current_user)
+):
+    if not digest.isalnum():
+        raise HTTPException(status_code=404, detail="Catalog bundle not found")
+
+    headers = {"Cache-Control": IMMUTABLE, "ETag": f'"{digest}"', "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == f'"{digest}"':
+        return Response(status_code=304, headers=headers)
+
+    accepted = accepted_encodings(request.headers.get("accept-encoding"))
+    candidates = [(accepted.get(token, accepted.get("*", 0.0)), token, suffix)
+                  for token, suffix in (("br", "br"), ("gzip", "gz"))]
+    # Highest q-value first; brotli wins ties
+    for q, token, suffix in sorted(candidates, key=lambda c: -c[0]):
+        path = catalog_bundles.bundle_path(language, digest, suffix)
+        if q > 0 and os.path.exists(path):
+            headers["Content-Encoding"] = token
+            return FileResponse(path, media_type="application/json", headers=headers)
+
+    # Clients that can't decompress get the plain JSON
+    path = catalog_bundles.bundle_path(language, digest, "gz")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Catalog bundle not found")
+    with open(path, "rb") as f:
+        return Response(gzip.decompress(f.read()), media_type="application/json", headers=headers)
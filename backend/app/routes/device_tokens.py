@@ -1,7 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from app.dependencies import get_current_user
-from app.models import User
+from app.dependencies import Principal, get_current_user, get_current_user_id
 import boto3
 import json
 
@@ -24,7 +23,7 @@ class NotificationRequest(BaseModel):
 @router.post("/")
 async def register_device_token(
     request: DeviceTokenRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     try:
         # Register device token with SNS
@@ -62,7 +61,7 @@ async def register_device_token(
 @router.post("/send-notification")
 async def send_notification_to_all_users(
     request: NotificationRequest,
-    current_user: User = Depends(get_current_user)
+    user_id: int = Depends(get_current_user_id)
 ):
     """Send notification to all users subscribed to the topic"""
     try:
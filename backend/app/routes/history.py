@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, literal_column, tuple_
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
 from app import models, schemas
 from app.database import SessionLocal
 from fastapi.security import OAuth2PasswordBearer
 from app.jwt_token import verify_access_token
-from datetime import datetime
+from app.view_log import record_replayed_views, record_views
+from datetime import datetime, timezone
 
 router = APIRouter(
     prefix="/history",
@@ -13,6 +17,11 @@ router = APIRouter(
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Older entries are trimmed as new ones arrive
+HISTORY_MAX_ENTRIES = int(os.getenv("HISTORY_MAX_ENTRIES", "500"))
+
 def get_db():
     db = SessionLocal()
     try:
@@ -26,50 +35,141 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     return payload["user_id"]
 
+def record_history(db: Session, rows):
+    table = models.TalkHistory.__table__
+    stmt = insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        constraint="unique_user_talk_history",
+        # Replayed offline views may be older than what is already stored
+        set_={"accessed_at": func.greatest(table.c.accessed_at, stmt.excluded.accessed_at)}
+    ).returning(table.c.user_id, literal_column("xmax = 0"))
+    # xmax is 0 only on freshly inserted rows; updates can't push a user over the cap
+    grown = {user_id for user_id, inserted in db.execute(stmt) if inserted}
+    for user_id in grown:
+        trim_history(db, user_id)
+
+def trim_history(db: Session, user_id: int):
+    """Delete a user's entries beyond the newest HISTORY_MAX_ENTRIES."""
+    overflow = db.query(models.TalkHistory.id).filter(
+        models.TalkHistory.user_id == user_id
+    ).order_by(
+        models.TalkHistory.accessed_at.desc(), models.TalkHistory.id.desc()
+    ).offset(HISTORY_MAX_ENTRIES)
+    db.query(models.TalkHistory).filter(
+        models.TalkHistory.user_id == user_id,
+        models.TalkHistory.id.in_(overflow.scalar_subquery())
+    ).delete(synchronize_session=False)
+
+def history_to_dict(item):
+    return {
+        "id": item.id,
+        "talk_title": item.talk_title,
+        "accessed_at": item.accessed_at.isoformat(),
+        "language": item.language
+    }
+
+def encode_cursor(item):
+    return f"{item.accessed_at.isoformat()},{item.id}"
+
+def decode_cursor(cursor):
+    try:
+        accessed_at, item_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(accessed_at), int(item_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.post("/")
 def add_to_history(
     entry: schemas.TalkHistoryCreate,
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user)
 ):
-    db.query(models.TalkHistory).filter(
-        models.TalkHistory.user_id == user_id,
-        models.TalkHistory.talk_title == entry.talk_title,
-        models.TalkHistory.language == entry.language
-    ).delete()
+    now = datetime.utcnow()
+    # Re-opening a talk moves accessed_at on its existing row; every open
+    # is also appended to the view log
+    record_history(db, [{
+        "user_id": user_id,
+        "talk_title": entry.talk_title,
+        "language": entry.language,
+        "accessed_at": now
+    }])
+    record_views(db, [{
+        "user_id": user_id,
+        "talk_title": entry.talk_title,
+        "language": entry.language,
+        "viewed_at": now
+    }])
     db.commit()
+    return {"message": "Talk added to history"}
 
-    # Add the new entry
-    new_entry = models.TalkHistory(
-        user_id=user_id,
-        talk_title=entry.talk_title,
-        accessed_at=datetime.utcnow(),
-        language=entry.language
-    )
-    db.add(new_entry)
+@router.post("/batch")
+def add_history_batch(
+    request: schemas.TalkHistoryBatchRequest,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user)
+):
+    now = datetime.utcnow()
+    latest = {}
+    views = []
+    for entry in request.entries:
+        accessed_at = entry.accessed_at
+        if accessed_at.tzinfo is not None:
+            accessed_at = accessed_at.astimezone(timezone.utc).replace(tzinfo=None)
+        # A device clock running fast mustn't pin an entry to the top
+        accessed_at = min(accessed_at, now)
+        views.append({
+            "user_id": user_id,
+            "talk_title": entry.talk_title,
+            "language": entry.language,
+            "viewed_at": accessed_at
+        })
+        key = (entry.talk_title, entry.language)
+        if key not in latest or accessed_at > latest[key]:
+            latest[key] = accessed_at
+
+    # One row per key (ON CONFLICT can't touch a row twice), in a fixed
+    # order so that concurrent batches lock rows in the same sequence. Those
+    # row locks also make a retried batch wait for the original to commit
+    # before it looks for views already logged.
+    record_history(db, [
+        {"user_id": user_id, "talk_title": title, "language": language, "accessed_at": accessed_at}
+        for (title, language), accessed_at in sorted(latest.items())
+    ])
+    record_replayed_views(db, user_id, views)
     db.commit()
-    db.refresh(new_entry)
-    return {"message": "Talk added to history"}
+    return {"message": "History recorded", "recorded": len(latest)}
 
 @router.get("/")
 def get_history(
     db: Session = Depends(get_db),
-    user_id: int = Depends(get_current_user)
+    user_id: int = Depends(get_current_user),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables paginated response"),
+    cursor: str = Query(None, description="next_cursor from the previous page")
 ):
-    history = (
-        db.query(models.TalkHistory)
-        .filter(models.TalkHistory.user_id == user_id)
-        .order_by(models.TalkHistory.accessed_at.desc())
-        .all()
+    history = db.query(
+        models.TalkHistory.id,
+        models.TalkHistory.talk_title,
+        models.TalkHistory.accessed_at,
+        models.TalkHistory.language
+    ).filter(
+        models.TalkHistory.user_id == user_id
+    ).order_by(
+        models.TalkHistory.accessed_at.desc(), models.TalkHistory.id.desc()
     )
-    return [
-        schemas.TalkHistoryOut(
-            id=item.id,
-            talk_title=item.talk_title,
-            accessed_at=item.accessed_at.isoformat(),
-            language=item.language
-        ) for item in history
-    ]
+
+    # Without paging parameters the whole (capped) history comes back as a list
+    if limit is None and cursor is None:
+        return [history_to_dict(item) for item in history]
+
+    page_size = limit or DEFAULT_PAGE_SIZE
+    if cursor is not None:
+        history = history.filter(
+            tuple_(models.TalkHistory.accessed_at, models.TalkHistory.id) < tuple_(*decode_cursor(cursor))
+        )
+    # Fetch one extra row to know whether another page follows
+    items = history.limit(page_size + 1).all()
+    next_cursor = encode_cursor(items[page_size - 1]) if len(items) > page_size else None
+    return {"items": [history_to_dict(item) for item in items[:page_size]], "next_cursor": next_cursor}
 
 @router.get("/{history_id}")
 def get_history_item(history_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
@@ -2,7 +2,7 @@ from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models
-from app.dependencies import get_current_user 
+from app.dependencies import get_current_user_id, invalidate_principal
 import os
 import uuid
 import boto3
@@ -17,8 +17,11 @@ router = APIRouter(
 def upload_profile_image(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    user_id: int = Depends(get_current_user_id)
 ):
+    current_user = db.query(models.User).filter(models.User.id == user_id).first()
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
     try:
         s3 = boto3.client("s3")
         bucket_name = os.getenv("S3_BUCKET_NAME")
@@ -33,7 +36,7 @@ def upload_profile_image(
         # Save URL to user profile
         current_user.profile_image = s3_url
         db.commit()
-        db.refresh(current_user)
+        invalidate_principal(user_id)
         return {"profile_image": s3_url}
     except (BotoCoreError, NoCredentialsError) as e:
         print(f"S3 error: {e}")
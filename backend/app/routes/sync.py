@@ -0,0 +1,62 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.jwt_token import verify_access_token
+from app.cache import get_catalog_version
+from app.serialization import catalog_columns, catalog_query, catalog_row
+from app import models
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["sync"]
+)
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    payload = verify_access_token(token)
+    if payload is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return payload["user_id"]
+
+def changed_rows(db, model, since, full):
+    if full:
+        rows = catalog_query(db, model).order_by(model.id).all()
+        return [catalog_row(row) for row in rows], []
+
+    rows = (
+        db.query(*catalog_columns(model), model.deleted_at)
+        .execution_options(include_deleted=True)
+        .filter(model.catalog_version > since)
+        .order_by(model.id)
+        .all()
+    )
+    upserted = [catalog_row(row[:-1]) for row in rows if row[-1] is None]
+    deleted = [row[0] for row in rows if row[-1] is not None]
+    return upserted, deleted
+
+@router.get("/catalog")
+def sync_catalog(
+    since: Optional[int] = Query(None, ge=0, description="Catalog version the client already holds; omit for a full sync"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # Read the version first: rows written after it are sent again next time,
+    # which is harmless because clients apply them as upserts
+    version = get_catalog_version(db)
+    # A client ahead of the server (e.g. after a restore) starts over. An
+    # unbumped catalog is at version 0, so 0 is a version like any other.
+    full = since is None or since > version
+
+    talks, deleted_talk_ids = changed_rows(db, models.Talk, since, full)
+    tools, deleted_tool_ids = changed_rows(db, models.Tool, since, full)
+    return {
+        "version": version,
+        "full": full,
+        "talks": talks,
+        "tools": tools,
+        "deleted_talk_ids": deleted_talk_ids,
+        "deleted_tool_ids": deleted_tool_ids
+    }
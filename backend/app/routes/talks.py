@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from sqlalchemy.sql import func
+from sqlalchemy import func
+from collections import Counter
 from app.database import SessionLocal
 from app.jwt_token import verify_access_token
-from app import models
+from app.cache import catalog_response
+from app.ttl_cache import TTLCache
+from app.serialization import catalog_columns, catalog_fields, catalog_query, catalog_row, encode_json
+from app.search import search
+from app.trending import trending_talks
+from app.related_talks import MAX_RELATED_TALKS, related_talks
+from app.like_counters import toggle_talk_like
+from app.like_buffer import like_buffer, talk_like_state
+from app import models, schemas
 
 router = APIRouter(
     prefix="/talks",
@@ -13,6 +23,13 @@ router = APIRouter(
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 500
+TRENDING_TTL_SECONDS = 60
+
+trending_cache = TTLCache(TRENDING_TTL_SECONDS)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -26,90 +43,148 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     return payload["user_id"]
 
+def talk_query(db, language, criteria):
+    query = catalog_query(db, models.Talk).filter(*criteria)
+    if language:
+        query = query.filter(models.Talk.language == language)
+    return query
+
+def keyset_page(query, after_id, limit):
+    query = query.order_by(models.Talk.id)
+    if after_id is not None:
+        query = query.filter(models.Talk.id > after_id)
+    return query.limit(limit)
+
+def stream_talks(criteria, language, after_id, limit):
+    # The request's session is closed before the body is sent, so the
+    # generator owns its own session and server-side cursor
+    db = SessionLocal()
+    try:
+        query = keyset_page(talk_query(db, language, criteria), after_id, limit)
+        yield b"["
+        separator = b""
+        for row in query.yield_per(STREAM_BATCH_SIZE):
+            yield separator + encode_json(catalog_row(row))
+            separator = b","
+        yield b"]"
+    finally:
+        db.close()
+
+def talk_list_response(request, db, key, criteria, language, after_id, limit, stream):
+    if stream:
+        return StreamingResponse(
+            stream_talks(criteria, language, after_id, limit),
+            media_type="application/json"
+        )
+
+    if after_id is None and limit is None:
+        def build_all():
+            # Return all fields, including language and related_title
+            return [catalog_row(row) for row in talk_query(db, language, criteria).all()]
+        return catalog_response(request, db, key, build_all)
+
+    page_size = limit or DEFAULT_PAGE_SIZE
+
+    def build_page():
+        # Fetch one extra row to know whether another page follows
+        talks = keyset_page(talk_query(db, language, criteria), after_id, page_size + 1).all()
+        items = [catalog_row(row) for row in talks[:page_size]]
+        next_after_id = items[-1]["id"] if len(talks) > page_size else None
+        return {"items": items, "next_after_id": next_after_id}
+    return catalog_response(request, db, key + (after_id, page_size), build_page)
+
 @router.get("/hazards")
-def get_unique_hazards(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    hazards = db.query(models.Talk.hazard).distinct().all()
-    return [h[0] for h in hazards if h[0]]
+def get_unique_hazards(request: Request, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    def build():
+        hazards = db.query(models.Talk.hazard).distinct().all()
+        return [h[0] for h in hazards if h[0]]
+    return catalog_response(request, db, ("hazards", None, None), build)
 
 @router.get("/industries")
-def get_unique_industries(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    industries = db.query(models.Talk.industry).distinct().all()
-    return [i[0] for i in industries if i[0]]
+def get_unique_industries(request: Request, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    def build():
+        industries = db.query(models.Talk.industry).distinct().all()
+        return [i[0] for i in industries if i[0]]
+    return catalog_response(request, db, ("industries", None, None), build)
+
+@router.get("/facets")
+def get_facets(
+    request: Request,
+    language: str = Query(None, description="Language code to count talks in"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    def build():
+        query = db.query(models.Talk.hazard, models.Talk.industry, func.count(models.Talk.id))
+        if language:
+            query = query.filter(models.Talk.language == language)
+        # One aggregate over (hazard, industry), folded into both facets
+        hazards, industries = Counter(), Counter()
+        for hazard, industry, count in query.group_by(models.Talk.hazard, models.Talk.industry):
+            if hazard:
+                hazards[hazard] += count
+            if industry:
+                industries[industry] += count
+        return {
+            "hazards": [{"name": name, "count": hazards[name]} for name in sorted(hazards)],
+            "industries": [{"name": name, "count": industries[name]} for name in sorted(industries)]
+        }
+    return catalog_response(request, db, ("facets", None, language), build)
 
 @router.get("/by_hazard")
 def get_talks_by_hazard(
+    request: Request,
     hazard: str = Query(..., description="Hazard name to filter talks"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user),
-    language: str = Query(None, description="Language code to filter talks")
+    language: str = Query(None, description="Language code to filter talks"),
+    after_id: int = Query(None, description="Return talks with an id greater than this cursor"),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables paginated response"),
+    stream: bool = Query(False, description="Stream the full result set as a JSON array")
 ):
-    query = db.query(models.Talk).filter(models.Talk.hazard == hazard)
-    if language:
-        query = query.filter(models.Talk.language == language)
-    talks = query.all()
-    return [
-        {
-            "id": t.id,
-            "title": t.title,
-            "category": t.category,
-            "description": t.description,
-            "hazard": t.hazard,
-            "industry": t.industry,
-            "language": t.language,
-            "related_title": t.related_title
-        }
-        for t in talks
-    ]
+    return talk_list_response(
+        request, db, ("by_hazard", hazard, language), [models.Talk.hazard == hazard],
+        language, after_id, limit, stream
+    )
 
 @router.get("/by_industry")
 def get_talks_by_industry(
+    request: Request,
     industry: str = Query(..., description="Industry name to filter talks"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user),
-    language: str = Query(None, description="Language code to filter talks")
+    language: str = Query(None, description="Language code to filter talks"),
+    after_id: int = Query(None, description="Return talks with an id greater than this cursor"),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables paginated response"),
+    stream: bool = Query(False, description="Stream the full result set as a JSON array")
 ):
-    query = db.query(models.Talk).filter(models.Talk.industry == industry)
-    if language:
-        query = query.filter(models.Talk.language == language)
-    talks = query.all()
-    return [
-        {
-            "id": t.id,
-            "title": t.title,
-            "category": t.category,
-            "description": t.description,
-            "hazard": t.hazard,
-            "industry": t.industry,
-            "language": t.language,
-            "related_title": t.related_title
-        }
-        for t in talks
-    ]
+    return talk_list_response(
+        request, db, ("by_industry", industry, language), [models.Talk.industry == industry],
+        language, after_id, limit, stream
+    )
 
 @router.get("/")
 def get_talks(
+    request: Request,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user),
-    language: str = Query(None, description="Language code to filter talks")
+    language: str = Query(None, description="Language code to filter talks"),
+    after_id: int = Query(None, description="Return talks with an id greater than this cursor"),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables paginated response"),
+    stream: bool = Query(False, description="Stream the full result set as a JSON array")
 ):
-    query = db.query(models.Talk)
-    if language:
-        query = query.filter(models.Talk.language == language)
-    talks = query.all()
-    # Return all fields, including language and related_title
-    return [
-        {
-            "id": t.id,
-            "title": t.title,
-            "category": t.category,
-            "description": t.description,
-            "hazard": t.hazard,
-            "industry": t.industry,
-            "language": t.language,
-            "related_title": t.related_title
-        }
-        for t in talks
-    ]
+    return talk_list_response(request, db, ("talks", None, language), [], language, after_id, limit, stream)
+
+@router.get("/search")
+def search_talks(
+    q: str = Query(..., min_length=1, description="Search terms"),
+    language: str = Query(None, description="Language code to filter talks"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    return [catalog_fields(t) for t in search(db, models.Talk, q, language, limit, offset)]
 
 @router.get("/popular")
 def get_popular_talks(
@@ -118,45 +193,84 @@ def get_popular_talks(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    # Aggregate likes by related_title
-    subq = db.query(
-        models.Talk.related_title,
-        func.count(models.TalkLike.id).label('like_count')
-    ).outerjoin(
-        models.TalkLike, models.Talk.id == models.TalkLike.talk_id
-    ).group_by(
-        models.Talk.related_title
-    ).subquery()
-
-    # Join to get a representative talk for each related_title in the requested language
+    # Counters are maintained per translation group, so this walks the like_count index
     popular_talks = db.query(
-        models.Talk,
-        subq.c.like_count
+        *catalog_columns(models.Talk),
+        models.TalkGroupStats.like_count
     ).join(
-        subq, models.Talk.related_title == subq.c.related_title
+        models.TalkGroupStats, models.Talk.group_id == models.TalkGroupStats.group_id
     ).filter(
         models.Talk.language == language
     ).order_by(
-        subq.c.like_count.desc()
+        models.TalkGroupStats.like_count.desc()
     ).limit(limit).all()
 
+    # Groups that have never been counted have no likes yet; use them to fill the list
+    if len(popular_talks) < limit:
+        uncounted = catalog_query(db, models.Talk).filter(
+            models.Talk.language == language,
+            ~db.query(models.TalkGroupStats).filter(
+                models.TalkGroupStats.group_id == models.Talk.group_id
+            ).exists()
+        ).limit(limit - len(popular_talks)).all()
+        popular_talks += [tuple(row) + (0,) for row in uncounted]
+
     result = []
-    for talk, like_count in popular_talks:
-        talk_dict = {
-            "id": talk.id,
-            "title": talk.title,
-            "category": talk.category,
-            "description": talk.description,
-            "hazard": talk.hazard,
-            "industry": talk.industry,
-            "language": talk.language,
-            "related_title": talk.related_title,
-            "like_count": like_count
-        }
+    for row in popular_talks:
+        talk_dict = catalog_row(row[:-1])
+        talk_dict["like_count"] = row[-1]
         result.append(talk_dict)
 
     return result
 
+@router.get("/trending")
+def get_trending_talks(
+    language: str = Query("en", description="Language code to filter trending talks"),
+    hours: int = Query(72, ge=1, le=24 * 30, description="How far back to count activity"),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # The rollup only moves when the job runs, so a short TTL loses nothing
+    key = (language, hours, limit)
+    body = trending_cache.get(key)
+    if body is None:
+        body = encode_json(trending_talks(db, language, hours, limit))
+        trending_cache.set(key, body)
+    return Response(content=body, media_type="application/json")
+
+@router.post("/likes/batch")
+def get_talk_likes_batch(
+    request: schemas.TalkLikesBatchRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # Group and counter for every requested talk
+    rows = db.query(
+        models.Talk.id,
+        models.Talk.group_id,
+        models.TalkGroupStats.like_count
+    ).outerjoin(
+        models.TalkGroupStats, models.TalkGroupStats.group_id == models.Talk.group_id
+    ).filter(models.Talk.id.in_(request.talk_ids)).all()
+
+    # Which of those groups the user has liked
+    group_ids = {group_id for _, group_id, _ in rows}
+    liked_groups = {
+        group_id for (group_id,) in db.query(models.TalkLike.group_id).filter(
+            models.TalkLike.user_id == current_user,
+            models.TalkLike.group_id.in_(group_ids)
+        )
+    } if group_ids else set()
+
+    result = []
+    for talk_id, group_id, like_count in rows:
+        like_count, user_liked = like_count or 0, group_id in liked_groups
+        if like_buffer.enabled:
+            like_count, user_liked = like_buffer.overlay(current_user, group_id, like_count, user_liked)
+        result.append({"talk_id": talk_id, "like_count": like_count, "user_liked": user_liked})
+    return result
+
 @router.get("/{talk_id}")
 def get_talk_by_id(
     talk_id: int,
@@ -168,37 +282,40 @@ def get_talk_by_id(
         raise HTTPException(status_code=404, detail="Talk not found")
     return talk
 
+@router.get("/{talk_id}/related")
+def get_related_talks(
+    talk_id: int,
+    limit: int = Query(5, ge=1, le=MAX_RELATED_TALKS),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # Reads the precomputed co-occurrence table; nothing is paired per request
+    result = related_talks(db, talk_id, limit)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Talk not found")
+    return result
+
 @router.post("/{talk_id}/like")
 def like_talk(
     talk_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    # Check if talk exists
-    talk = db.query(models.Talk).filter(models.Talk.id == talk_id).first()
-    if not talk:
+    if like_buffer.enabled:
+        # Answered from memory; written with the next bulk flush
+        result = like_buffer.toggle(db, current_user, talk_id)
+    else:
+        result = toggle_talk_like(db, current_user, talk_id)
+    if result is None:
         raise HTTPException(status_code=404, detail="Talk not found")
-    related_title = talk.related_title
-
-    # Find all talks with this related_title
-    related_talk_ids = [t.id for t in db.query(models.Talk).filter(models.Talk.related_title == related_title).all()]
-
-    # Check if already liked (by any talk in this group)
-    existing_like = db.query(models.TalkLike).filter(
-        models.TalkLike.talk_id.in_(related_talk_ids),
-        models.TalkLike.user_id == current_user
-    ).first()
-
-    if existing_like:
-        db.delete(existing_like)
-        db.commit()
-        return {"message": "Talk unliked successfully"}
-
-    # Like the current talk (could also pick the first in group)
-    new_like = models.TalkLike(talk_id=talk_id, user_id=current_user)
-    db.add(new_like)
     db.commit()
-    return {"message": "Talk liked successfully"}
+
+    liked, like_count = result
+    return {
+        "message": "Talk liked successfully" if liked else "Talk unliked successfully",
+        "liked": liked,
+        "like_count": like_count
+    }
 
 @router.get("/{talk_id}/likes")
 def get_talk_likes(
@@ -206,26 +323,16 @@ def get_talk_likes(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    # Check if talk exists
-    talk = db.query(models.Talk).filter(models.Talk.id == talk_id).first()
-    if not talk:
+    # Group counter and the user's like for all translations in one indexed lookup
+    if like_buffer.enabled:
+        state = like_buffer.like_state(db, current_user, talk_id)
+    else:
+        state = talk_like_state(db, current_user, talk_id)
+    if state is None:
         raise HTTPException(status_code=404, detail="Talk not found")
-    related_title = talk.related_title
-    related_talk_ids = [t.id for t in db.query(models.Talk).filter(models.Talk.related_title == related_title).all()]
-
-    # Get like count for all translations
-    like_count = db.query(func.count(models.TalkLike.id)).filter(
-        models.TalkLike.talk_id.in_(related_talk_ids)
-    ).scalar()
-
-    # Check if current user has liked any translation
-    user_liked = db.query(models.TalkLike).filter(
-        models.TalkLike.talk_id.in_(related_talk_ids),
-        models.TalkLike.user_id == current_user
-    ).first() is not None
+    _, like_count, user_liked = state
 
     return {
         "like_count": like_count,
         "user_liked": user_liked
     }
-
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app import models, schemas
-from app.database import SessionLocal, engine
+from app.database import SessionLocal
 from fastapi.security import OAuth2PasswordBearer
 from app.jwt_token import verify_access_token
 import msal
@@ -11,9 +11,6 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
-
 router = APIRouter(
     prefix="/ticket",
     tags=["ticket"]
@@ -1,33 +1,134 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import os
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import and_, extract, func
 from typing import List, Optional
 from app.database import get_db
 from app.models import Tool, ToolLike
-from app.schemas import ToolCreate, ToolOut
-from app.dependencies import get_current_user
-from app.models import User
+from app.schemas import ToolCreate, ToolOut, ToolLikesBatchRequest
+from app.dependencies import Principal, get_current_user, get_current_user_id
+from app.search import search
+from app.like_counters import toggle_tool_like
+from app.cache import catalog_response
+from app.ttl_cache import TTLCache
+from app.serialization import catalog_columns, catalog_query, catalog_row, encode_json
 
 router = APIRouter(
     prefix="/tools",
     tags=["tools"]
 )
 
+# Rankings can lag behind new likes by this much
+POPULAR_TOOLS_TTL_SECONDS = float(os.getenv("POPULAR_TOOLS_TTL_SECONDS", "60"))
+popular_tools_cache = TTLCache(POPULAR_TOOLS_TTL_SECONDS)
+
+MAX_POPULAR_WINDOW = timedelta(days=365)
+
+def parse_window(window: str) -> timedelta:
+    amount, unit = int(window[:-1]), window[-1]
+    span = timedelta(hours=amount) if unit == "h" else timedelta(days=amount)
+    if span > MAX_POPULAR_WINDOW:
+        raise HTTPException(status_code=422, detail="window can be at most 8760h or 365d")
+    return span
+
+def rank_popular_tools(db: Session, limit: int, language: Optional[str], window: Optional[str]):
+    """Top tools by likes in one aggregate query.
+
+    Within a window each like's weight falls linearly from 1 (just now) to 0
+    (at the window's start), so recent likes outrank older ones.
+    """
+    join_on = ToolLike.tool_id == Tool.id
+    like_count = func.count(ToolLike.id)
+    if window:
+        span = parse_window(window)
+        cutoff = datetime.utcnow() - span
+        join_on = and_(join_on, ToolLike.created_at >= cutoff)
+        age_weight = extract("epoch", ToolLike.created_at - cutoff) / span.total_seconds()
+        score = func.coalesce(func.sum(age_weight), 0)
+    else:
+        score = like_count
+
+    query = db.query(*catalog_columns(Tool), like_count, score).outerjoin(ToolLike, join_on)
+    if language:
+        query = query.filter(Tool.language == language)
+    rows = query.group_by(Tool.id).order_by(score.desc(), Tool.id).limit(limit).all()
+
+    result = []
+    for row in rows:
+        tool = catalog_row(row[:-2])
+        tool["like_count"] = row[-2]
+        result.append(tool)
+    return result
+
 @router.get("/", response_model=List[ToolOut])
 def get_tools(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = None,
     language: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(Tool)
-    
-    if category:
-        query = query.filter(Tool.category == category)
-    if language:
-        query = query.filter(Tool.language == language)
+    def build():
+        query = catalog_query(db, Tool)
         
-    return query.offset(skip).limit(limit).all()
+        if category:
+            query = query.filter(Tool.category == category)
+        if language:
+            query = query.filter(Tool.language == language)
+            
+        # Rows are already in ToolOut's shape; skip per-row validation
+        return [catalog_row(row) for row in query.offset(skip).limit(limit).all()]
+    return catalog_response(request, db, ("tools", category, language, skip, limit), build)
+
+@router.get("/search", response_model=List[ToolOut])
+def search_tools(
+    q: str = Query(..., min_length=1),
+    language: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    return search(db, Tool, q, language, limit, offset)
+
+@router.post("/likes/batch")
+def get_tool_likes_batch(
+    request: ToolLikesBatchRequest,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    counts = db.query(Tool.id, func.count(ToolLike.id)).outerjoin(
+        ToolLike, ToolLike.tool_id == Tool.id
+    ).filter(Tool.id.in_(request.tool_ids)).group_by(Tool.id).all()
+
+    liked = {
+        tool_id for (tool_id,) in db.query(ToolLike.tool_id).filter(
+            ToolLike.user_id == user_id,
+            ToolLike.tool_id.in_(request.tool_ids)
+        )
+    }
+
+    return [
+        {"tool_id": tool_id, "like_count": like_count, "user_liked": tool_id in liked}
+        for tool_id, like_count in counts
+    ]
+
+@router.get("/popular")
+def get_popular_tools(
+    limit: int = Query(5, ge=1, le=100),
+    language: Optional[str] = None,
+    window: Optional[str] = Query(None, pattern=r"^[1-9][0-9]{0,3}[hd]$", description="Only count recent likes, e.g. 24h or 7d, up to 365d"),
+    db: Session = Depends(get_db)
+):
+    if window:
+        parse_window(window)
+    key = (limit, language, window)
+    body = popular_tools_cache.get(key)
+    if body is None:
+        body = encode_json(rank_popular_tools(db, limit, language, window))
+        popular_tools_cache.set(key, body)
+    return Response(content=body, media_type="application/json")
 
 @router.get("/{tool_id}", response_model=ToolOut)
 def get_tool(tool_id: int, db: Session = Depends(get_db)):
@@ -40,34 +141,16 @@ def get_tool(tool_id: int, db: Session = Depends(get_db)):
 def like_tool(
     tool_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    # The cached principal still turns away tokens of deleted accounts
+    current_user: Principal = Depends(get_current_user)
 ):
-    tool = db.query(Tool).filter(Tool.id == tool_id).first()
-    if not tool:
+    result = toggle_tool_like(db, current_user.id, tool_id)
+    if result is None:
         raise HTTPException(status_code=404, detail="Tool not found")
-    
-    existing_like = db.query(ToolLike).filter(
-        ToolLike.user_id == current_user.id,
-        ToolLike.tool_id == tool_id
-    ).first()
-    
-    if existing_like:
-        db.delete(existing_like)
-        db.commit()
-        return {"message": "Tool unliked"}
-    
-    new_like = ToolLike(user_id=current_user.id, tool_id=tool_id)
-    db.add(new_like)
     db.commit()
-    return {"message": "Tool liked"}
 
-@router.get("/popular", response_model=List[ToolOut])
-def get_popular_tools(
-    limit: int = Query(5, ge=1, le=100),
-    db: Session = Depends(get_db)
-):
-    tools = db.query(Tool).all()
-    return sorted(tools, key=lambda x: x.like_count, reverse=True)[:limit]
+    liked, like_count = result
+    return {"message": "Tool liked" if liked else "Tool unliked", "liked": liked, "like_count": like_count}
 
 @router.get("/{tool_id}/like-count")
 def get_tool_like_count(tool_id: int, db: Session = Depends(get_db)):
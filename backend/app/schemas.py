@@ -1,7 +1,8 @@
 # app/schemas.py
 
-from pydantic import BaseModel, EmailStr, constr
+from pydantic import BaseModel, EmailStr, constr, conlist
 from typing import Optional
+from datetime import datetime
 
 class UserCreate(BaseModel):
     username: constr(min_length=1)
@@ -23,6 +24,14 @@ class TalkHistoryCreate(BaseModel):
     talk_title: str
     language: str
 
+class TalkHistoryBatchEntry(TalkHistoryCreate):
+    # When the talk was opened on the device. Required: it is what tells a
+    # retried upload's views apart from new ones.
+    accessed_at: datetime
+
+class TalkHistoryBatchRequest(BaseModel):
+    entries: conlist(TalkHistoryBatchEntry, min_length=1, max_length=500)
+
 class TalkHistoryOut(BaseModel):
     id: int
     talk_title: str
@@ -57,6 +66,9 @@ class TalkOut(TalkBase):
     class Config:
         orm_mode = True
 
+class TalkLikesBatchRequest(BaseModel):
+    talk_ids: conlist(int, min_length=1, max_length=200)
+
 class ToolBase(BaseModel):
     title: str
     category: str
@@ -74,6 +86,9 @@ class ToolOut(ToolBase):
     class Config:
         from_attributes = True
 
+class ToolLikesBatchRequest(BaseModel):
+    tool_ids: conlist(int, min_length=1, max_length=200)
+
 class PasswordResetRequest(BaseModel):
     email: EmailStr
 
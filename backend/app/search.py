@@ -0,0 +1,146 @@
+# app/search.py
+
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from sqlalchemy import func, literal_column, or_, text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import get_catalog_version
+
+# 'simple' keeps stemming out of the way: the catalog mixes en/es/fr
+TS_CONFIG = "simple"
+TITLE_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+SEARCHABLE_TABLES = {
+    models.Talk: "talks",
+    models.Tool: "tools",
+}
+
+_trigram_available = {}
+_fallback_indexes = {}
+_fallback_lock = threading.Lock()
+
+
+def tokenize(value):
+    return re.findall(r"\w+", (value or "").lower())
+
+
+def document_sql(table):
+    return f"to_tsvector('{TS_CONFIG}', coalesce({table}.title, '') || ' ' || coalesce({table}.description, ''))"
+
+
+def create_search_indexes(conn):
+    """Create the full-text (and, when available, trigram) indexes on Postgres."""
+    available = conn.execute(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first() is not None
+    if available:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    for table in SEARCHABLE_TABLES.values():
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING gin ({document_sql(table)})"
+        ))
+        if available:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_title_trgm ON {table} USING gin (title gin_trgm_ops)"
+            ))
+
+
+def has_trigram(db: Session) -> bool:
+    engine = db.get_bind()
+    if engine not in _trigram_available:
+        _trigram_available[engine] = db.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).first() is not None
+    return _trigram_available[engine]
+
+
+class InvertedIndex:
+    """Token -> {row id: score} postings used when Postgres isn't available."""
+
+    def __init__(self, rows):
+        postings = defaultdict(lambda: defaultdict(int))
+        self.languages = {}
+        for row_id, language, title, description in rows:
+            self.languages[row_id] = language
+            for token in tokenize(title):
+                postings[token][row_id] += TITLE_WEIGHT
+            for token in tokenize(description):
+                postings[token][row_id] += DESCRIPTION_WEIGHT
+        self.postings = postings
+        self.tokens = sorted(postings)
+
+    def _prefix_matches(self, prefix):
+        matches = defaultdict(int)
+        start = bisect.bisect_left(self.tokens, prefix)
+        for token in self.tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            for row_id, score in self.postings[token].items():
+                matches[row_id] = max(matches[row_id], score)
+        return matches
+
+    def search(self, q, language=None):
+        scores = None
+        for prefix in tokenize(q):
+            matches = self._prefix_matches(prefix)
+            if scores is None:
+                scores = dict(matches)
+            else:
+                # Every query term has to match, like the tsquery '&'
+                scores = {row_id: scores[row_id] + score for row_id, score in matches.items() if row_id in scores}
+        if not scores:
+            return []
+        if language:
+            scores = {row_id: score for row_id, score in scores.items() if self.languages[row_id] == language}
+        return sorted(scores, key=lambda row_id: (-scores[row_id], row_id))
+
+
+def fallback_index(db: Session, model) -> InvertedIndex:
+    # Versions are tracked per database here; the shared catalog_cache belongs
+    # to the app's own engine and mustn't see another database's version
+    version = get_catalog_version(db)
+    key = (db.get_bind(), model)
+    with _fallback_lock:
+        entry = _fallback_indexes.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+    rows = db.query(model.id, model.language, model.title, model.description).all()
+    index = InvertedIndex(rows)
+    with _fallback_lock:
+        _fallback_indexes[key] = (version, index)
+    return index
+
+
+def search(db: Session, model, q: str, language=None, limit=20, offset=0):
+    """Return catalog rows of ``model`` matching ``q``, best match first."""
+    tokens = tokenize(q)
+    if not tokens:
+        return []
+
+    if db.get_bind().dialect.name != "postgresql":
+        ids = fallback_index(db, model).search(q, language)[offset:offset + limit]
+        if not ids:
+            return []
+        rows = {row.id: row for row in db.query(model).filter(model.id.in_(ids)).all()}
+        return [rows[row_id] for row_id in ids if row_id in rows]
+
+    table = SEARCHABLE_TABLES[model]
+    document = literal_column(document_sql(table))
+    # Prefix query so results show up while the user is still typing
+    ts_query = func.to_tsquery(TS_CONFIG, " & ".join(f"{token}:*" for token in tokens))
+    match = document.op("@@")(ts_query)
+    rank = func.ts_rank_cd(document, ts_query)
+    if has_trigram(db):
+        match = or_(match, model.title.op("%")(q))
+        rank = rank + func.similarity(model.title, q)
+
+    query = db.query(model).filter(match)
+    if language:
+        query = query.filter(model.language == language)
+    return query.order_by(rank.desc(), model.id).offset(offset).limit(limit).all()
@@ -0,0 +1,39 @@
+# app/serialization.py
+
+import orjson
+from sqlalchemy.orm import Session
+
+# The fields every catalog listing (talks and tools) returns, in column order
+CATALOG_FIELDS = (
+    "id",
+    "title",
+    "category",
+    "description",
+    "hazard",
+    "industry",
+    "language",
+    "related_title",
+)
+
+
+def encode_json(content) -> bytes:
+    # Compact UTF-8 like starlette's JSONResponse, several times faster
+    return orjson.dumps(content)
+
+
+def catalog_columns(model):
+    return [getattr(model, field) for field in CATALOG_FIELDS]
+
+
+def catalog_query(db: Session, model):
+    """Select only the listed columns: rows come back as plain tuples, not ORM objects."""
+    return db.query(*catalog_columns(model))
+
+
+def catalog_row(row) -> dict:
+    return dict(zip(CATALOG_FIELDS, row))
+
+
+def catalog_fields(obj) -> dict:
+    """Same shape as ``catalog_row`` for an already loaded Talk or Tool."""
+    return {field: getattr(obj, field) for field in CATALOG_FIELDS}
@@ -0,0 +1,71 @@
+# app/talk_groups.py
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.like_counters import rebuild_talk_group_stats
+
+GROUPED_TABLES = {"talk": "talks", "tool": "tools"}
+
+
+def _has_column(conn, table, column):
+    return conn.execute(text(
+        "SELECT 1 FROM information_schema.columns WHERE table_name = :table AND column_name = :column"
+    ), {"table": table, "column": column}).first() is not None
+
+
+def backfill_talk_groups(conn):
+    """Move a Postgres database from related_title joins onto talk_groups.
+
+    Safe to run more than once. Runs inside the caller's transaction.
+    """
+    models.TalkGroup.__table__.create(bind=conn, checkfirst=True)
+
+    for kind, table in GROUPED_TABLES.items():
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS group_id INTEGER REFERENCES talk_groups(id)"
+        ))
+        conn.execute(text(
+            f"INSERT INTO talk_groups (kind, related_title) "
+            f"SELECT DISTINCT :kind, related_title FROM {table} "
+            f"ON CONFLICT ON CONSTRAINT unique_group_kind_related_title DO NOTHING"
+        ), {"kind": kind})
+        conn.execute(text(
+            f"UPDATE {table} SET group_id = g.id FROM talk_groups g "
+            f"WHERE g.kind = :kind AND g.related_title = {table}.related_title "
+            f"AND {table}.group_id IS DISTINCT FROM g.id"
+        ), {"kind": kind})
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN group_id SET NOT NULL"))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_group_id ON {table} (group_id)"))
+
+    conn.execute(text(
+        "ALTER TABLE talk_likes ADD COLUMN IF NOT EXISTS group_id INTEGER REFERENCES talk_groups(id)"
+    ))
+    conn.execute(text(
+        "UPDATE talk_likes SET group_id = talks.group_id FROM talks "
+        "WHERE talks.id = talk_likes.talk_id AND talk_likes.group_id IS DISTINCT FROM talks.group_id"
+    ))
+    # Likes on two translations of the same talk collapse into the oldest one
+    removed = conn.execute(text(
+        "DELETE FROM talk_likes a USING talk_likes b "
+        "WHERE a.user_id = b.user_id AND a.group_id = b.group_id AND a.id > b.id"
+    )).rowcount
+    conn.execute(text("ALTER TABLE talk_likes ALTER COLUMN group_id SET NOT NULL"))
+    if not conn.execute(text(
+        "SELECT 1 FROM pg_constraint WHERE conname = 'unique_user_talk_group_like'"
+    )).first():
+        conn.execute(text(
+            "ALTER TABLE talk_likes ADD CONSTRAINT unique_user_talk_group_like UNIQUE (user_id, group_id)"
+        ))
+
+    # Counters used to be keyed by related_title; they are derived data, so rebuild
+    if _has_column(conn, "talk_group_stats", "related_title"):
+        conn.execute(text("DROP TABLE talk_group_stats"))
+    models.TalkGroupStats.__table__.create(bind=conn, checkfirst=True)
+    session = Session(bind=conn)
+    groups = rebuild_talk_group_stats(session)
+    session.flush()
+    session.close()
+
+    return {"groups": groups, "duplicate_likes_removed": removed}
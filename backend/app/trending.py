@@ -0,0 +1,109 @@
+# app/trending.py
+
+import math
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import extract, func, text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.serialization import catalog_columns, catalog_row
+from app.view_log import VIEW_REPLAY_WINDOW
+
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_LIKE_WEIGHT = 3
+TRENDING_VIEW_WEIGHT = 1
+
+# Rows stored less than this long ago may still be in uncommitted
+# transactions, so the rollup leaves them for the next run
+ROLLUP_LAG = timedelta(minutes=1)
+WATERMARK = "talk_activity_hourly"
+
+# The watermark follows ingested_at, when the server stored each event, so
+# buffered likes and replayed offline views count however late they arrive.
+# They still land in the hour they happened.
+ROLL_UP_LIKES = text("""
+    INSERT INTO talk_activity_hourly (group_id, hour, likes, views)
+    SELECT group_id, date_trunc('hour', created_at), count(*), 0
+    FROM talk_likes
+    WHERE ingested_at > :since AND ingested_at <= :until
+    GROUP BY 1, 2
+    ON CONFLICT (group_id, hour) DO UPDATE SET likes = talk_activity_hourly.likes + EXCLUDED.likes
+""")
+
+# Views name the talk by title and language. None is logged more than
+# VIEW_REPLAY_WINDOW after it happened, so :oldest lets the planner skip
+# all but the recent partitions.
+ROLL_UP_VIEWS = text("""
+    INSERT INTO talk_activity_hourly (group_id, hour, likes, views)
+    SELECT talks.group_id, date_trunc('hour', talk_views.viewed_at), 0, count(*)
+    FROM talk_views
+    JOIN talks ON talks.title = talk_views.talk_title AND talks.language = talk_views.language
+    WHERE talk_views.ingested_at > :since AND talk_views.ingested_at <= :until
+        AND talk_views.viewed_at >= :oldest
+    GROUP BY 1, 2
+    ON CONFLICT (group_id, hour) DO UPDATE SET views = talk_activity_hourly.views + EXCLUDED.views
+""")
+
+
+def lock_watermark(db: Session, name: str):
+    """The named watermark row, locked until the transaction ends so that
+    concurrent runs queue up instead of processing the same events twice."""
+    watermark = db.query(models.RollupWatermark).filter(
+        models.RollupWatermark.name == name
+    ).with_for_update().first()
+    if watermark is None:
+        watermark = models.RollupWatermark(name=name, rolled_up_to=datetime(1970, 1, 1))
+        db.add(watermark)
+    return watermark
+
+
+def oldest_new_view(since: datetime) -> datetime:
+    """Earliest viewed_at a view ingested after ``since`` can have. The lag
+    covers requests that checked the replay window just before ``since``."""
+    return since - VIEW_REPLAY_WINDOW - ROLLUP_LAG
+
+
+def roll_up_talk_activity(db: Session, until: datetime = None):
+    """Fold likes and views since the last run into the hourly rollup.
+
+    Runs in the caller's transaction and returns the ``(since, until)`` range
+    it covered.
+    """
+    until = until or datetime.utcnow() - ROLLUP_LAG
+    watermark = lock_watermark(db, WATERMARK)
+    since = watermark.rolled_up_to
+    if until <= since:
+        return since, since
+
+    params = {"since": since, "until": until, "oldest": oldest_new_view(since)}
+    db.execute(ROLL_UP_LIKES, params)
+    db.execute(ROLL_UP_VIEWS, params)
+    watermark.rolled_up_to = until
+    db.flush()
+    return since, until
+
+
+def trending_talks(db: Session, language: str, hours: int, limit: int):
+    """Talks ranked by recent likes and views, each hour's activity halving in
+    weight every ``TRENDING_HALF_LIFE_HOURS``. Reads only the rollup table."""
+    now = datetime.utcnow()
+    activity = models.TalkActivityHourly
+    age_hours = extract("epoch", now - activity.hour) / 3600.0
+    decay = func.exp(-math.log(2) * age_hours / TRENDING_HALF_LIFE_HOURS)
+    score = func.sum((activity.likes * TRENDING_LIKE_WEIGHT + activity.views * TRENDING_VIEW_WEIGHT) * decay)
+
+    rows = db.query(*catalog_columns(models.Talk), score).join(
+        activity, activity.group_id == models.Talk.group_id
+    ).filter(
+        models.Talk.language == language,
+        activity.hour >= now - timedelta(hours=hours)
+    ).group_by(models.Talk.id).order_by(score.desc(), models.Talk.id).limit(limit).all()
+
+    result = []
+    for row in rows:
+        talk = catalog_row(row[:-1])
+        talk["score"] = round(float(row[-1]), 4)
+        result.append(talk)
+    return result
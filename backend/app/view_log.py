@@ -0,0 +1,178 @@
+# app/view_log.py
+
+import gzip
+import os
+import re
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app import models
+
+# Monthly partitions are created this many months ahead of the current one
+VIEW_PARTITIONS_AHEAD = int(os.getenv("VIEW_PARTITIONS_AHEAD", "3"))
+# Uploaded views older than this are not logged, so the rollups only need to
+# look this far behind their watermark and can skip older partitions
+VIEW_REPLAY_WINDOW = timedelta(days=int(os.getenv("VIEW_REPLAY_DAYS", "30")))
+ARCHIVE_BATCH_ROWS = 50000
+DEFAULT_PARTITION = "talk_views_default"
+PARTITION_NAME = re.compile(r"^talk_views_(\d{4})_(\d{2})$")
+ARCHIVE_COLUMNS = "user_id, talk_title, language, viewed_at"
+
+
+def record_views(db: Session, rows):
+    """Append view events (user_id, talk_title, language, viewed_at) to the log."""
+    db.execute(models.TalkView.__table__.insert().values(rows))
+
+
+def record_replayed_views(db: Session, user_id: int, rows):
+    """Log a user's uploaded views, skipping any the batch repeats or the log
+    already holds, so a client retrying an upload doesn't count twice, and
+    any older than ``VIEW_REPLAY_WINDOW``. Returns how many were logged."""
+    table = models.TalkView.__table__
+    oldest = datetime.utcnow() - VIEW_REPLAY_WINDOW
+    keys = {
+        (row["talk_title"], row["language"], row["viewed_at"])
+        for row in rows if row["viewed_at"] >= oldest
+    }
+    if not keys:
+        return 0
+    logged = {
+        tuple(row) for row in db.execute(
+            select(table.c.talk_title, table.c.language, table.c.viewed_at).where(
+                table.c.user_id == user_id,
+                table.c.viewed_at.in_({viewed_at for _, _, viewed_at in keys})
+            )
+        )
+    }
+    new = sorted(keys - logged)
+    if new:
+        record_views(db, [
+            {"user_id": user_id, "talk_title": title, "language": language, "viewed_at": viewed_at}
+            for title, language, viewed_at in new
+        ])
+    return len(new)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"talk_views_{month:%Y_%m}"
+
+
+def view_partitions(conn):
+    """Monthly partitions of talk_views as ``{first day of month: name}``, oldest first."""
+    rows = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits"
+        " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+        " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+        " WHERE parent.relname = 'talk_views'"
+    ))
+    partitions = {}
+    for (name,) in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return dict(sorted(partitions.items()))
+
+
+def create_view_partition(conn, month: date):
+    start, end = month, add_months(month, 1)
+    # Views that fell into the default partition for lack of this one would
+    # violate its bounds, so they move across with it
+    strays = conn.execute(text(
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE viewed_at >= :start AND viewed_at < :end"
+        f" RETURNING {ARCHIVE_COLUMNS}, ingested_at"
+    ), {"start": start, "end": end}).fetchall()
+    conn.execute(text(
+        f"CREATE TABLE {partition_name(month)} PARTITION OF talk_views"
+        f" FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    if strays:
+        conn.execute(models.TalkView.__table__.insert(), [dict(row._mapping) for row in strays])
+
+
+def ensure_view_partitions(conn, since: date = None):
+    """Create the default partition and any missing monthly partitions from
+    ``since`` (default: this month) to ``VIEW_PARTITIONS_AHEAD`` months out.
+    Returns the names created."""
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF talk_views DEFAULT"))
+    existing = view_partitions(conn)
+    this_month = datetime.utcnow().date().replace(day=1)
+    month = min(since or this_month, this_month).replace(day=1)
+    created = []
+    while month <= add_months(this_month, VIEW_PARTITIONS_AHEAD):
+        if month not in existing:
+            create_view_partition(conn, month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def expired_view_partitions(conn, keep_months: int, today: date = None):
+    """Partitions whose whole month is older than the last ``keep_months`` months."""
+    first = (today or datetime.utcnow().date()).replace(day=1)
+    cutoff = add_months(first, -keep_months)
+    return [name for month, name in view_partitions(conn).items() if month < cutoff]
+
+
+def archive_view_partition(conn, name: str, archive_dir: str, file_format: str = "csv"):
+    """Write a partition to ``archive_dir`` as gzipped CSV or Parquet.
+
+    Returns ``(path, rows)``. The file only appears under its final name once
+    it is complete, so a failed run leaves nothing that looks archived.
+    """
+    if not PARTITION_NAME.match(name):
+        raise ValueError(f"Not a talk_views partition: {name}")
+    os.makedirs(archive_dir, exist_ok=True)
+    extension = {"csv": "csv.gz", "parquet": "parquet"}[file_format]
+    path = os.path.join(archive_dir, f"{name}.{extension}")
+    partial = path + ".partial"
+    query = f"SELECT {ARCHIVE_COLUMNS} FROM {name} ORDER BY viewed_at"
+
+    if file_format == "csv":
+        cursor = conn.connection.cursor()
+        with gzip.open(partial, "wb") as out:
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", out)
+        rows = cursor.rowcount
+    else:
+        rows = _write_parquet(conn, query, partial)
+    os.replace(partial, path)
+    return path, rows
+
+
+def _write_parquet(conn, query, path):
+    # Optional dependency; only needed for --format parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("user_id", pa.int64()),
+        ("talk_title", pa.string()),
+        ("language", pa.string()),
+        ("viewed_at", pa.timestamp("us")),
+    ])
+    result = conn.execution_options(stream_results=True).execute(text(query))
+    rows = 0
+    try:
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            while True:
+                batch = result.fetchmany(ARCHIVE_BATCH_ROWS)
+                if not batch:
+                    break
+                writer.write_table(pa.Table.from_pylist([dict(row._mapping) for row in batch], schema=schema))
+                rows += len(batch)
+    finally:
+        # The server-side cursor has to be closed before the partition is dropped
+        result.close()
+    return rows
+
+
+def drop_view_partition(conn, name: str):
+    if not PARTITION_NAME.match(name):
+        raise ValueError(f"Not a talk_views partition: {name}")
+    conn.execute(text(f"DROP TABLE {name}"))
@@ -0,0 +1,60 @@
+import argparse
+import os
+from sqlalchemy import create_engine
+from app.migrations import upgrade
+from app.database import SQLALCHEMY_DATABASE_URL
+from app.view_log import (
+    archive_view_partition,
+    drop_view_partition,
+    ensure_view_partitions,
+    expired_view_partitions,
+)
+
+HISTORY_RETENTION_MONTHS = int(os.getenv("HISTORY_RETENTION_MONTHS", "12"))
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR", "archive/talk_views")
+
+def archive_history(keep_months, archive_dir, file_format, dry_run):
+    """Maintain the monthly partitions of the talk_views log.
+
+    Creates the partitions for the coming months, then writes each month
+    older than the retention window to ``archive_dir`` and drops its
+    partition. Meant to run daily from cron; each month is archived and
+    dropped in its own transaction, so an interrupted run just resumes.
+    """
+    try:
+        engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+        # Ensure the schema is up to date
+        upgrade(engine)
+
+        with engine.begin() as conn:
+            for name in ensure_view_partitions(conn):
+                print(f"Created partition {name}")
+
+        with engine.connect() as conn:
+            expired = expired_view_partitions(conn, keep_months)
+        if not expired:
+            print(f"No partitions older than {keep_months} months")
+            return
+
+        for name in expired:
+            if dry_run:
+                print(f"Would archive and drop {name}")
+                continue
+            with engine.begin() as conn:
+                path, rows = archive_view_partition(conn, name, archive_dir, file_format)
+                drop_view_partition(conn, name)
+            print(f"Archived {rows} views from {name} to {path} and dropped the partition")
+
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=archive_history.__doc__.splitlines()[0])
+    parser.add_argument("--keep-months", type=int, default=HISTORY_RETENTION_MONTHS)
+    parser.add_argument("--archive-dir", default=HISTORY_ARCHIVE_DIR)
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv",
+                        help="parquet needs pyarrow installed")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    archive_history(args.keep_months, args.archive_dir, args.format, args.dry_run)
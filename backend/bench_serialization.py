@@ -0,0 +1,76 @@
+import argparse
+import json
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.schemas import ToolOut
+from app.serialization import catalog_query, catalog_row, encode_json
+
+def starlette_json(content):
+    # What the list endpoints used to encode with
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def orm_dicts(session):
+    # Before: hydrate Talk objects, then copy attributes into dicts
+    talks = session.query(models.Talk).all()
+    return starlette_json([{
+        "id": t.id,
+        "title": t.title,
+        "category": t.category,
+        "description": t.description,
+        "hazard": t.hazard,
+        "industry": t.industry,
+        "language": t.language,
+        "related_title": t.related_title
+    } for t in talks])
+
+def orm_pydantic(session):
+    # Before: the tools path, validating every row through ToolOut
+    talks = session.query(models.Talk).all()
+    return starlette_json([ToolOut.model_validate(t).model_dump() for t in talks])
+
+def projected_orjson(session):
+    # After: column tuples straight into orjson
+    return encode_json([catalog_row(row) for row in catalog_query(session, models.Talk).all()])
+
+def seed(engine, rows):
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        group_id = conn.execute(models.TalkGroup.__table__.insert().values(kind="talk", related_title="bench")).inserted_primary_key[0]
+        conn.execute(models.Talk.__table__.insert(), [{
+            "title": f"Benchmark talk {i}",
+            "category": "Hazards",
+            "description": "Keep walkways clear of cords, spills and debris. " * 4,
+            "hazard": f"Hazard {i % 40}",
+            "industry": f"Industry {i % 12}",
+            "language": ("en", "es", "fr")[i % 3],
+            "related_title": "bench",
+            "group_id": group_id,
+            "catalog_version": 0
+        } for i in range(rows)])
+
+def bench_serialization(rows, repeat):
+    """Compare rows/sec of the old and new list serialization on a synthetic catalog"""
+    engine = create_engine("sqlite://")
+    seed(engine, rows)
+    Session = sessionmaker(bind=engine)
+
+    print(f"Serializing {rows} talks, best of {repeat} runs")
+    for name, serialize in (("ORM + dicts + json", orm_dicts), ("ORM + pydantic + json", orm_pydantic), ("columns + orjson", projected_orjson)):
+        best = None
+        for _ in range(repeat):
+            session = Session()
+            start = time.perf_counter()
+            body = serialize(session)
+            elapsed = time.perf_counter() - start
+            session.close()
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"- {name:24} {rows / best:>12,.0f} rows/sec  ({best * 1000:.0f} ms, {len(body) / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=bench_serialization.__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    bench_serialization(args.rows, args.repeat)
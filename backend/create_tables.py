@@ -1,5 +1,8 @@
-from app.database import Base, engine
-from app import models
+from app.database import engine
+from app.migrations import upgrade
 
-Base.metadata.create_all(bind=engine)
-print("✅ Tables created")
+applied = upgrade(engine)
+if applied:
+    print(f"✅ Applied migrations: {', '.join(str(v) for v in applied)}")
+else:
+    print("✅ Schema is up to date")
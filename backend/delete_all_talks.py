@@ -1,7 +1,9 @@
 import os
+from datetime import datetime
 from sqlalchemy import create_engine
-from app.models import Talk, TalkLike, Base
+from app.models import Talk, TalkLike, TalkGroupStats, Base
 from app.database import SQLALCHEMY_DATABASE_URL
+from app.cache import bump_catalog_version
 from sqlalchemy.orm import sessionmaker
 
 def delete_all_talks():
@@ -30,9 +32,16 @@ def delete_all_talks():
         # Delete in correct order: likes first, then talks
         print("Deleting all talk likes...")
         session.query(TalkLike).delete()
+        session.query(TalkGroupStats).delete()
         
+        # Talks become tombstones so that syncing devices drop them too
         print("Deleting all talks...")
-        session.query(Talk).delete()
+        version = bump_catalog_version(session)
+        now = datetime.utcnow()
+        session.query(Talk).filter(Talk.deleted_at.is_(None)).update(
+            {Talk.deleted_at: now, Talk.updated_at: now, Talk.catalog_version: version},
+            synchronize_session=False
+        )
         
         session.commit()
         
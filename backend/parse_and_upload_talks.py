@@ -1,7 +1,10 @@
 import pandas as pd
 from sqlalchemy import create_engine
-from app.models import Talk, Base
+from app.models import Talk
+from app.migrations import upgrade
 from app.database import SQLALCHEMY_DATABASE_URL
+from app.cache import bump_catalog_version
+from app.catalog_bundles import build_catalog_bundles
 from sqlalchemy.orm import sessionmaker
 import os
 
@@ -26,8 +29,8 @@ def upload_talks():
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
         session = SessionLocal()
 
-        # Ensure the table exists
-        Base.metadata.create_all(bind=engine)
+        # Ensure the schema is up to date
+        upgrade(engine)
 
         # Counter for new talks
         new_talks = 0
@@ -51,10 +54,25 @@ def upload_talks():
                 continue
 
             # Check for duplicate by title and language
-            existing = session.query(Talk).filter_by(title=title, language=language).first()
-            if existing:
+            existing = (
+                session.query(Talk)
+                .execution_options(include_deleted=True)
+                .filter_by(title=title, language=language)
+                .first()
+            )
+            if existing and existing.deleted_at is None:
                 skipped_talks += 1
                 continue
+            if existing:
+                # Bring a deleted talk back under its old id
+                existing.deleted_at = None
+                existing.category = category
+                existing.description = description
+                existing.hazard = hazard
+                existing.industry = industry
+                existing.related_title = related_title
+                new_talks += 1
+                continue
 
             talk = Talk(
                 title=title,
@@ -68,9 +86,19 @@ def upload_talks():
             session.add(talk)
             new_talks += 1
 
+        # Invalidate cached catalog responses on every API worker
+        if new_talks:
+            bump_catalog_version(session)
+
         # Commit the changes
         print("Committing changes to database...")
         session.commit()
+
+        # Rebuild the per-language app bootstrap bundles
+        if new_talks:
+            print("Building catalog bundles...")
+            manifest = build_catalog_bundles(session)
+            print(f"Built bundles for {len(manifest['bundles'])} languages")
         session.close()
 
         print(f'Successfully uploaded {new_talks} new talks!')
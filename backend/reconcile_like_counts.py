@@ -0,0 +1,41 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import TalkGroupStats
+from app.migrations import upgrade
+from app.database import SQLALCHEMY_DATABASE_URL
+from app.like_counters import rebuild_talk_group_stats
+
+def reconcile_like_counts():
+    """Rebuild talk_group_stats from the talk_likes table"""
+    try:
+        print("Setting up database connection...")
+        engine = create_engine(SQLALCHEMY_DATABASE_URL)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        session = SessionLocal()
+
+        # Ensure the schema is up to date
+        upgrade(engine)
+
+        before = {row.group_id: row.like_count for row in session.query(TalkGroupStats).all()}
+
+        print("Rebuilding like counters...")
+        groups = rebuild_talk_group_stats(session)
+        session.commit()
+
+        after = {row.group_id: row.like_count for row in session.query(TalkGroupStats).all()}
+        drifted = [group_id for group_id, count in after.items() if before.get(group_id, 0) != count]
+
+        print(f"Reconciled {groups} talk groups, {len(drifted)} counters corrected")
+        for group_id in drifted[:20]:
+            print(f"- group {group_id}: {before.get(group_id, 0)} -> {after[group_id]}")
+
+        session.close()
+
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        if 'session' in locals():
+            session.rollback()
+            session.close()
+
+if __name__ == "__main__":
+    reconcile_like_counts()
@@ -0,0 +1,40 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.migrations import upgrade
+from app.database import SQLALCHEMY_DATABASE_URL
+from app.trending import roll_up_talk_activity
+from app.related_talks import update_related_talks
+
+def rollup_talk_activity():
+    """Fold new likes and talk views into talk_activity_hourly and
+    talk_cooccurrences.
+
+    Meant to run every few minutes from cron; /talks/trending and
+    /talks/{id}/related read only these tables.
+    """
+    try:
+        engine = create_engine(SQLALCHEMY_DATABASE_URL)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        session = SessionLocal()
+
+        # Ensure the schema is up to date
+        upgrade(engine)
+
+        since, until = roll_up_talk_activity(session)
+        session.commit()
+        print(f"Rolled up talk activity from {since} to {until}")
+
+        since, until = update_related_talks(session)
+        session.commit()
+        print(f"Updated related talks from {since} to {until}")
+
+        session.close()
+
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        if 'session' in locals():
+            session.rollback()
+            session.close()
+
+if __name__ == "__main__":
+    rollup_talk_activity()
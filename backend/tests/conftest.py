@@ -1,10 +1,11 @@
 import os
 import sys
+import uuid
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
-from app import models
+from app import database, models
 from app.database import Base
 from app.main import app
 from app.routes.auth import get_db
@@ -42,3 +43,58 @@ def client():
 
     yield TestClient(app)
 
+
+@pytest.fixture
+def language():
+    # A throwaway language code keeps each test's catalog slice isolated
+    return f"t{uuid.uuid4().hex[:6]}"
+
+
+def register_and_login(client):
+    username = f"user_{uuid.uuid4().hex[:6]}"
+    client.post("/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "phone": "1234567890",
+        "password": "testpass"
+    })
+    response = client.post("/auth/login", data={
+        "username": username,
+        "password": "testpass"
+    })
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="module")
+def api_client():
+    # Plain client for the app's own database; ``client`` above seeds the SQLite one
+    yield TestClient(app)
+
+
+def add_talk(language, title, bump=True, **fields):
+    db = database.TestingSessionLocal()
+    try:
+        values = dict(
+            title=title,
+            category=fields.pop("category", "Hazards"),
+            language=language,
+            related_title=fields.pop("related_title", title),
+            **fields
+        )
+        if bump:
+            talk = models.Talk(**values)
+            db.add(talk)
+            db.commit()
+            return talk.id
+        # A Core insert skips the ORM hooks, so the catalog version stays put
+        group = db.query(models.TalkGroup).filter_by(kind="talk", related_title=values["related_title"]).first()
+        if group is None:
+            group = models.TalkGroup(kind="talk", related_title=values["related_title"])
+            db.add(group)
+            db.flush()
+        result = db.execute(models.Talk.__table__.insert().values(group_id=group.id, **values))
+        db.commit()
+        return result.inserted_primary_key[0]
+    finally:
+        db.close()
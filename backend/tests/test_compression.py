@@ -0,0 +1,74 @@
+import os
+import uuid
+from app.cache import catalog_cache
+from app.compression import accepted_encodings, choose_encoding, compressible
+from tests.conftest import add_talk, register_and_login
+
+
+def test_accept_encoding_negotiation():
+    assert accepted_encodings("gzip;q=0.5, br") == {"gzip": 0.5, "br": 1.0}
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding(None) is None
+
+
+def test_catalog_list_is_served_precompressed(api_client, language):
+    headers = register_and_login(api_client)
+    for i in range(30):
+        add_talk(language, f"Compressed talk {i}", description="Wear hearing protection near loud machinery.")
+
+    response = api_client.get(f"/talks/?language={language}", headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert len(response.json()) == 30
+
+    # The compressed body is kept with the cache entry
+    _, _, variants = catalog_cache._entries[("talks", None, language)]
+    assert "gzip" in variants
+
+    plain = api_client.get(f"/talks/?language={language}", headers={**headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == response.json()
+    assert plain.headers["etag"] != response.headers["etag"]
+
+    revalidated = api_client.get(f"/talks/?language={language}", headers={
+        **headers, "Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]
+    })
+    assert revalidated.status_code == 304
+
+
+def test_streamed_and_small_responses(api_client, language):
+    headers = register_and_login(api_client)
+    ids = [add_talk(language, f"Streamed talk {i}", description="Check the guard before starting.") for i in range(30)]
+
+    response = api_client.get(f"/talks/?language={language}&stream=true", headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert [t["id"] for t in response.json()] == ids
+
+    # Below the minimum size the body goes out as is
+    response = api_client.get(f"/talks/{ids[0]}", headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+
+def test_only_text_and_json_are_compressed():
+    assert compressible("application/json")
+    assert compressible("text/html; charset=utf-8")
+    assert not compressible("image/png")
+    assert not compressible("application/pdf")
+    assert not compressible(None)
+
+
+def test_static_media_is_not_recompressed(api_client):
+    path = os.path.join("app", "static", f"{uuid.uuid4().hex}.png")
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG" + b"\0" * 4096)
+    try:
+        response = api_client.get(f"/static/{os.path.basename(path)}", headers={"Accept-Encoding": "gzip, br"})
+    finally:
+        os.remove(path)
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
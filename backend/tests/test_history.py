@@ -0,0 +1,76 @@
+from tests.conftest import register_and_login
+
+
+def open_talk(api_client, headers, title, language="en"):
+    response = api_client.post("/history/", json={"talk_title": title, "language": language}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["message"] == "Talk added to history"
+
+
+def test_reopening_a_talk_updates_its_row(api_client):
+    headers = register_and_login(api_client)
+    open_talk(api_client, headers, "Fall Protection")
+    open_talk(api_client, headers, "Ladder Safety")
+    first = api_client.get("/history/", headers=headers).json()
+    assert [item["talk_title"] for item in first] == ["Ladder Safety", "Fall Protection"]
+
+    open_talk(api_client, headers, "Fall Protection")
+    again = api_client.get("/history/", headers=headers).json()
+    assert [item["talk_title"] for item in again] == ["Fall Protection", "Ladder Safety"]
+    # Same row, newer timestamp
+    assert again[0]["id"] == first[1]["id"]
+    assert again[0]["accessed_at"] > first[1]["accessed_at"]
+
+    # A different language is a separate entry
+    open_talk(api_client, headers, "Fall Protection", language="es")
+    assert len(api_client.get("/history/", headers=headers).json()) == 3
+
+
+def test_history_pages_and_retention_cap(api_client, monkeypatch):
+    from app.routes import history
+    monkeypatch.setattr(history, "HISTORY_MAX_ENTRIES", 4)
+    headers = register_and_login(api_client)
+    for i in range(6):
+        open_talk(api_client, headers, f"Talk {i}")
+
+    # Only the newest four survive
+    everything = api_client.get("/history/", headers=headers).json()
+    assert [item["talk_title"] for item in everything] == ["Talk 5", "Talk 4", "Talk 3", "Talk 2"]
+
+    page = api_client.get("/history/?limit=3", headers=headers).json()
+    seen = [item["id"] for item in page["items"]]
+    assert len(seen) == 3
+    page = api_client.get(f"/history/?limit=3&cursor={page['next_cursor']}", headers=headers).json()
+    seen += [item["id"] for item in page["items"]]
+    assert page["next_cursor"] is None
+    assert seen == [item["id"] for item in everything]
+
+    assert api_client.get("/history/?cursor=garbage", headers=headers).status_code == 400
+
+
+def test_batch_history_keeps_latest_view(api_client):
+    headers = register_and_login(api_client)
+    open_talk(api_client, headers, "Hot Work")
+    stored = api_client.get("/history/", headers=headers).json()[0]
+
+    response = api_client.post("/history/batch", json={"entries": [
+        {"talk_title": "Hot Work", "language": "en", "accessed_at": "2024-01-01T08:00:00"},
+        {"talk_title": "Lifting", "language": "en", "accessed_at": "2024-01-02T08:00:00"},
+        {"talk_title": "Lifting", "language": "en", "accessed_at": "2024-01-03T08:00:00+02:00"},
+        {"talk_title": "Lifting", "language": "en", "accessed_at": "2024-01-01T08:00:00"},
+        {"talk_title": "Lifting", "language": "fr", "accessed_at": "2024-01-04T08:00:00"},
+    ]}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["recorded"] == 3
+
+    history = {(item["talk_title"], item["language"]): item for item in api_client.get("/history/", headers=headers).json()}
+    assert len(history) == 3
+    # The replayed older view doesn't move the stored one back
+    assert history[("Hot Work", "en")] == stored
+    assert history[("Lifting", "en")]["accessed_at"] == "2024-01-03T06:00:00"
+    assert history[("Lifting", "fr")]["accessed_at"] == "2024-01-04T08:00:00"
+
+    assert api_client.post("/history/batch", json={"entries": []}, headers=headers).status_code == 422
+    # Without a device timestamp a retried entry couldn't be recognised
+    response = api_client.post("/history/batch", json={"entries": [{"talk_title": "Lifting", "language": "de"}]}, headers=headers)
+    assert response.status_code == 422
@@ -0,0 +1,44 @@
+from datetime import timedelta
+import pytest
+from app import jwt_token
+from app.jwt_token import create_access_token, token_cache, verify_access_token
+from app import main
+from app.metrics import metrics
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    calls = []
+    decode = jwt_token.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt_token.jwt, "decode", counting_decode)
+    token_cache.clear()
+    metrics.reset()
+    return calls
+
+
+def test_verified_claims_are_cached_until_expiry(api_client, decodes, monkeypatch):
+    token = create_access_token({"user_id": 42})
+    assert verify_access_token(token)["user_id"] == 42
+    assert verify_access_token(token)["user_id"] == 42
+    assert len(decodes) == 1
+
+    # Rejected tokens are checked every time and never cached
+    expired = create_access_token({"user_id": 42}, expires_delta=timedelta(seconds=-1))
+    tampered = token[:-2] + ("A" if token[-2] != "A" else "B") + token[-1]
+    for bad in (expired, tampered, expired):
+        assert verify_access_token(bad) is None
+    assert len(decodes) == 4
+
+    monkeypatch.setattr(main, "METRICS_TOKEN", None)
+    assert api_client.get("/metrics").status_code == 404
+    monkeypatch.setattr(main, "METRICS_TOKEN", "scrape-secret")
+    assert api_client.get("/metrics").status_code == 401
+    snapshot = api_client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).json()
+    assert snapshot["counters"] == {"jwt.cache_hits": 1, "jwt.cache_misses": 4}
+    assert snapshot["jwt_cache_hit_rate"] == 0.2
+    assert snapshot["timings"]["jwt.verify"]["count"] == 4
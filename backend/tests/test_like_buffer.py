@@ -0,0 +1,102 @@
+import uuid
+import pytest
+from app import models
+from app.database import TestingSessionLocal
+from app import like_buffer as like_buffer_module
+from app.like_buffer import like_buffer
+from app.like_counters import get_talk_like_count
+from tests.conftest import add_talk, register_and_login
+
+
+@pytest.fixture
+def buffered(monkeypatch):
+    monkeypatch.setattr(like_buffer, "enabled", True)
+    monkeypatch.setattr(like_buffer, "session_factory", TestingSessionLocal)
+    yield like_buffer
+    like_buffer.flush()
+
+
+def stored_likes(talk_id):
+    db = TestingSessionLocal()
+    try:
+        group_id = db.query(models.Talk.group_id).filter(models.Talk.id == talk_id).scalar()
+        likes = db.query(models.TalkLike).filter(models.TalkLike.group_id == group_id).count()
+        return likes, get_talk_like_count(db, group_id)
+    finally:
+        db.close()
+
+
+def test_buffered_likes_collapse_and_flush(api_client, buffered):
+    talk_id = add_talk("en", "Silica Dust", related_title=f"group_{uuid.uuid4().hex[:6]}")
+    alice, bob = register_and_login(api_client), register_and_login(api_client)
+
+    # Three taps end up liked; nothing is written yet but the user sees their like
+    for _ in range(3):
+        response = api_client.post(f"/talks/{talk_id}/like", headers=alice).json()
+    assert (response["liked"], response["like_count"]) == (True, 1)
+    assert api_client.post(f"/talks/{talk_id}/like", headers=bob).json()["like_count"] == 2
+    assert stored_likes(talk_id) == (0, 0)
+    assert api_client.get(f"/talks/{talk_id}/likes", headers=alice).json() == {"like_count": 2, "user_liked": True}
+
+    assert buffered.flush() == 2
+    assert stored_likes(talk_id) == (2, 2)
+
+    # Unlike then like again collapses to nothing to write
+    api_client.post(f"/talks/{talk_id}/like", headers=alice)
+    api_client.post(f"/talks/{talk_id}/like", headers=alice)
+    assert buffered.flush() == 0
+
+    # Shutdown writes what is still queued
+    assert api_client.post(f"/talks/{talk_id}/like", headers=bob).json() == {
+        "message": "Talk unliked successfully", "liked": False, "like_count": 1
+    }
+    buffered.start()
+    buffered.stop()
+    assert stored_likes(talk_id) == (1, 1)
+
+
+def test_failed_flush_keeps_counts(api_client, buffered, monkeypatch):
+    talk_id = add_talk("en", "Hot Work", related_title=f"group_{uuid.uuid4().hex[:6]}")
+    alice = register_and_login(api_client)
+    api_client.post(f"/talks/{talk_id}/like", headers=alice)
+
+    def fail():
+        raise RuntimeError("database went away")
+
+    def failing_session():
+        db = TestingSessionLocal()
+        db.commit = fail
+        return db
+
+    monkeypatch.setattr(buffered, "session_factory", failing_session)
+    assert buffered.flush() == 0
+    # A tap during the outage undoes the like; the count follows both
+    api_client.post(f"/talks/{talk_id}/like", headers=alice)
+    api_client.post(f"/talks/{talk_id}/like", headers=alice)
+    assert api_client.get(f"/talks/{talk_id}/likes", headers=alice).json() == {"like_count": 1, "user_liked": True}
+
+    monkeypatch.setattr(buffered, "session_factory", TestingSessionLocal)
+    assert buffered.flush() == 1
+    assert stored_likes(talk_id) == (1, 1)
+    assert api_client.get(f"/talks/{talk_id}/likes", headers=alice).json() == {"like_count": 1, "user_liked": True}
+
+
+def test_flush_during_read_is_not_double_counted(api_client, buffered, monkeypatch):
+    talk_id = add_talk("en", "Lockout Tagout", related_title=f"group_{uuid.uuid4().hex[:6]}")
+    alice, bob = register_and_login(api_client), register_and_login(api_client)
+    api_client.post(f"/talks/{talk_id}/like", headers=alice)
+
+    # Alice's like commits right after Bob's toggle read the stored count
+    read = like_buffer_module.talk_like_state
+    flushed = []
+
+    def read_then_flush(db, user_id, talk_id):
+        state = read(db, user_id, talk_id)
+        if not flushed:
+            flushed.append(buffered.flush())
+        return state
+
+    monkeypatch.setattr(like_buffer_module, "talk_like_state", read_then_flush)
+    response = api_client.post(f"/talks/{talk_id}/like", headers=bob).json()
+    assert flushed == [1]
+    assert (response["liked"], response["like_count"]) == (True, 2)
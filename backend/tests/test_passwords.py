@@ -0,0 +1,53 @@
+import uuid
+from passlib.context import CryptContext
+from app import models, passwords
+from app.database import TestingSessionLocal
+from app.metrics import metrics
+from app.passwords import password_hasher
+
+
+def bcrypt_rounds(rounds):
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def stored_hash(username):
+    db = TestingSessionLocal()
+    try:
+        return db.query(models.User.hashed_password).filter(models.User.username == username).scalar()
+    finally:
+        db.close()
+
+
+def test_login_rehashes_when_cost_changes(api_client, monkeypatch):
+    username = f"user_{uuid.uuid4().hex[:6]}"
+    monkeypatch.setattr(passwords, "pwd_context", bcrypt_rounds(4))
+    response = api_client.post("/auth/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "testpass"
+    })
+    assert response.status_code == 200
+    assert stored_hash(username).startswith("$2b$04$")
+
+    monkeypatch.setattr(passwords, "pwd_context", bcrypt_rounds(5))
+    login = {"username": username, "password": "testpass"}
+    assert api_client.post("/auth/login", data=login).status_code == 200
+    upgraded = stored_hash(username)
+    assert upgraded.startswith("$2b$05$")
+
+    # Up to date now, and wrong passwords still fail
+    assert api_client.post("/auth/login", data=login).status_code == 200
+    assert stored_hash(username) == upgraded
+    assert api_client.post("/auth/login", data={"username": username, "password": "nope"}).status_code == 403
+    assert metrics.snapshot()["timings"]["passwords.verify"]["count"] >= 3
+
+
+def test_deep_queue_fails_fast(api_client, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    rejected = metrics.snapshot()["counters"].get("passwords.rejected", 0)
+    username = f"user_{uuid.uuid4().hex[:6]}"
+    response = api_client.post("/auth/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "testpass"
+    })
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert metrics.snapshot()["counters"]["passwords.rejected"] == rejected + 1
+    assert stored_hash(username) is None
@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import event
+from app.database import engine
+from app.dependencies import principal_cache
+from app.jwt_token import verify_access_token
+from tests.conftest import register_and_login
+
+
+@pytest.fixture
+def user_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_principal_is_cached_until_account_is_deleted(api_client, user_queries):
+    headers = register_and_login(api_client)
+    user_id = verify_access_token(headers["Authorization"].split()[1])["user_id"]
+    user_queries.clear()
+
+    # Only the first request loads the user
+    for _ in range(3):
+        assert api_client.post("/tools/999999999/like", headers=headers).status_code == 404
+    assert len(user_queries) == 1
+    assert principal_cache.get(user_id).id == user_id
+
+    # Claims-only routes never look the user up
+    assert api_client.post("/tools/likes/batch", json={"tool_ids": [1]}, headers=headers).status_code == 200
+    assert len(user_queries) == 1
+
+    response = api_client.request("DELETE", "/auth/delete-account", json={"password": "testpass"}, headers=headers)
+    assert response.status_code == 200
+    assert principal_cache.get(user_id) is None
+    assert api_client.post("/tools/999999999/like", headers=headers).status_code == 401
@@ -0,0 +1,106 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text, tuple_
+from app import models
+from app.database import TestingSessionLocal, engine
+from app.migrations import MIGRATIONS, upgrade
+
+
+@pytest.fixture
+def db():
+    if engine.dialect.name != "postgresql":
+        pytest.skip("query plans are only checked on Postgres")
+    db = TestingSessionLocal()
+    seed_rows(db)
+    # Fresh statistics, and tiny test tables would otherwise always be sequentially scanned
+    for table in ("talks", "talk_history", "tickets", "talk_likes", "password_resets", "talk_group_stats", "talk_cooccurrences"):
+        db.execute(text(f"ANALYZE {table}"))
+    db.execute(text("SET enable_seqscan = off"))
+    try:
+        yield db
+    finally:
+        db.rollback()
+        db.close()
+
+
+def seed_rows(db):
+    # Rolled back after the test; gives an empty database's planner realistic spreads
+    group_id = db.execute(models.TalkGroup.__table__.insert().values(
+        kind="talk", related_title="__plan_seed__"
+    )).inserted_primary_key[0]
+    db.execute(models.Talk.__table__.insert(), [{
+        "title": f"Seed {i}", "category": "Seed", "hazard": f"hazard {i % 20}", "industry": f"industry {i % 20}",
+        "language": f"l{i % 5}", "related_title": "__plan_seed__", "group_id": group_id
+    } for i in range(1000)])
+    db.execute(models.TalkHistory.__table__.insert(), [{
+        "user_id": 1000000 + i % 100, "talk_title": f"Seed {i}", "language": "en",
+        "accessed_at": datetime(2024, 1, 1) + timedelta(minutes=i)
+    } for i in range(1000)])
+
+
+def plan_indexes(db, query):
+    compiled = query.statement.compile(dialect=engine.dialect)
+    plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    found = set()
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Index Name" in node:
+            found.add(node["Index Name"])
+        nodes.extend(node.get("Plans", []))
+    return found
+
+
+# Probe values that match nothing, so the estimate favours the most selective index
+PROBE = "__plan_probe__"
+
+HOT_QUERIES = {
+    "ix_talks_language_id": lambda db: db.query(models.Talk).filter(
+        models.Talk.language == PROBE, models.Talk.id > 0
+    ).order_by(models.Talk.id).limit(100),
+    "ix_talks_hazard_language_id": lambda db: db.query(models.Talk).filter(
+        models.Talk.hazard == "hazard 3", models.Talk.language == "l1"
+    ).order_by(models.Talk.id).limit(100),
+    "ix_talks_industry_language_id": lambda db: db.query(models.Talk).filter(
+        models.Talk.industry == "industry 3", models.Talk.language == "l1"
+    ).order_by(models.Talk.id).limit(100),
+    "ix_talks_related_title": lambda db: db.query(models.Talk.id).filter(
+        models.Talk.related_title == PROBE
+    ),
+    "ix_talks_catalog_version": lambda db: db.query(models.Talk).execution_options(include_deleted=True).filter(
+        models.Talk.catalog_version > 2 ** 30
+    ),
+    "ix_talk_history_user_id_accessed_at_id": lambda db: db.query(models.TalkHistory).filter(
+        models.TalkHistory.user_id == 1,
+        tuple_(models.TalkHistory.accessed_at, models.TalkHistory.id) < tuple_(datetime(2024, 1, 1), 1)
+    ).order_by(models.TalkHistory.accessed_at.desc(), models.TalkHistory.id.desc()).limit(50),
+    "ix_tickets_user_id": lambda db: db.query(models.Ticket).filter(models.Ticket.user_id == 1),
+    "ix_talk_likes_talk_id": lambda db: db.query(models.TalkLike.id).filter(models.TalkLike.talk_id == 1),
+    "ix_password_resets_email_is_used_expires_at": lambda db: db.query(models.PasswordReset).filter(
+        models.PasswordReset.email == PROBE,
+        models.PasswordReset.is_used == False,
+        models.PasswordReset.expires_at > datetime(2024, 1, 1)
+    ),
+    "talk_cooccurrences_pkey": lambda db: db.query(models.TalkCooccurrence).filter(
+        models.TalkCooccurrence.group_id == 1
+    ).order_by(models.TalkCooccurrence.co_views.desc()).limit(5),
+    "ix_talk_group_stats_like_count": lambda db: db.query(models.TalkGroupStats).order_by(
+        models.TalkGroupStats.like_count.desc()
+    ).limit(5),
+}
+
+
+@pytest.mark.parametrize("index_name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(db, index_name):
+    found = plan_indexes(db, HOT_QUERIES[index_name](db))
+    assert index_name in found, found
+
+
+def test_migrations_are_applied_once():
+    assert upgrade(engine) == []
+    versions = [version for version, _, _, _ in MIGRATIONS]
+    assert versions == sorted(set(versions))
@@ -0,0 +1,84 @@
+import uuid
+from datetime import datetime, timedelta
+from app import models, related_talks
+from app.database import TestingSessionLocal
+from app.related_talks import WATERMARK, update_related_talks
+from tests.conftest import add_talk, register_and_login
+
+
+def log_views(db, language, sessions, start):
+    for minutes in sessions:
+        user = models.User(username=f"user_{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@example.com")
+        db.add(user)
+        db.flush()
+        for title, offset in minutes:
+            db.add(models.TalkView(user_id=user.id, talk_title=title, language=language, viewed_at=start + timedelta(minutes=offset)))
+
+
+def test_related_talks_from_shared_sessions(api_client, monkeypatch):
+    headers = register_and_login(api_client)
+    language = f"r{uuid.uuid4().hex[:6]}"
+    titles = ["Scaffolds", "Harnesses", "Guardrails", "Ladders"]
+    ids = {title: add_talk(language, title, related_title=f"group_{uuid.uuid4().hex[:6]}") for title in titles}
+    now = datetime.utcnow()
+
+    db = TestingSessionLocal()
+    try:
+        watermark = db.query(models.RollupWatermark).get(WATERMARK)
+        if watermark is None:
+            db.add(models.RollupWatermark(name=WATERMARK, rolled_up_to=now - timedelta(days=1)))
+        else:
+            watermark.rolled_up_to = now - timedelta(days=1)
+        log_views(db, language, [
+            [("Scaffolds", 0), ("Harnesses", 10), ("Harnesses", 12), ("Guardrails", 200)],
+            [("Scaffolds", 0), ("Guardrails", 5)],
+            [("Harnesses", 0), ("Scaffolds", 20)],
+        ], now - timedelta(hours=6))
+        db.commit()
+        update_related_talks(db, until=datetime.utcnow())
+        db.commit()
+    finally:
+        db.close()
+
+    def related(title):
+        response = api_client.get(f"/talks/{ids[title]}/related", headers=headers)
+        assert response.status_code == 200
+        return [(talk["title"], talk["co_views"]) for talk in response.json()]
+
+    # Guardrails 200 minutes later started a new session
+    assert related("Scaffolds") == [("Harnesses", 2), ("Guardrails", 1)]
+    assert related("Guardrails") == [("Scaffolds", 1)]
+    assert related("Ladders") == []
+    assert api_client.get("/talks/999999999/related", headers=headers).status_code == 404
+
+    # A later run adds to the counts and trims each touched group to its top K
+    monkeypatch.setattr(related_talks, "RELATED_TALKS_KEEP", 1)
+    db = TestingSessionLocal()
+    try:
+        log_views(db, language, [[("Scaffolds", 0), ("Ladders", 3)]], now + timedelta(minutes=1))
+        db.commit()
+        update_related_talks(db, until=datetime.utcnow())
+        db.commit()
+    finally:
+        db.close()
+    assert related("Scaffolds") == [("Harnesses", 2)]
+    assert related("Ladders") == [("Scaffolds", 1)]
+    assert related("Guardrails") == [("Scaffolds", 1)]
+
+    # A view uploaded from offline pairs with views already rolled up
+    monkeypatch.setattr(related_talks, "RELATED_TALKS_KEEP", 50)
+    db = TestingSessionLocal()
+    try:
+        user = models.User(username=f"user_{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@example.com")
+        db.add(user)
+        db.flush()
+        db.add(models.TalkView(user_id=user.id, talk_title="Ladders", language=language, viewed_at=now))
+        db.commit()
+        update_related_talks(db, until=datetime.utcnow())
+        db.add(models.TalkView(user_id=user.id, talk_title="Guardrails", language=language, viewed_at=now - timedelta(minutes=5)))
+        db.commit()
+        update_related_talks(db, until=datetime.utcnow())
+        db.commit()
+    finally:
+        db.close()
+    assert related("Guardrails") == [("Scaffolds", 1), ("Ladders", 1)]
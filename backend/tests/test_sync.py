@@ -0,0 +1,65 @@
+from datetime import datetime
+from app import models
+from app.database import TestingSessionLocal
+from tests.conftest import add_talk, register_and_login
+
+
+def update_talk(talk_id, **fields):
+    db = TestingSessionLocal()
+    try:
+        talk = db.query(models.Talk).execution_options(include_deleted=True).get(talk_id)
+        for name, value in fields.items():
+            setattr(talk, name, value)
+        db.commit()
+    finally:
+        db.close()
+
+
+def sync(api_client, headers, since=None):
+    params = {} if since is None else {"since": since}
+    response = api_client.get("/sync/catalog", params=params, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_sync_returns_changes_since_version(api_client):
+    headers = register_and_login(api_client)
+    start = sync(api_client, headers)
+    assert start["full"] is True
+    # Holding the current version is not the same as never having synced
+    assert sync(api_client, headers, start["version"])["full"] is False
+
+    talk_id = add_talk("en", "Forklift Basics", hazard="Vehicles")
+    changes = sync(api_client, headers, start["version"])
+    assert changes["full"] is False
+    assert changes["version"] > start["version"]
+    assert [t["id"] for t in changes["talks"]] == [talk_id]
+    assert changes["tools"] == [] and changes["deleted_talk_ids"] == []
+
+    # Nothing changed since the last sync
+    assert sync(api_client, headers, changes["version"])["talks"] == []
+
+    update_talk(talk_id, description="Updated")
+    updated = sync(api_client, headers, changes["version"])
+    assert [(t["id"], t["description"]) for t in updated["talks"]] == [(talk_id, "Updated")]
+
+
+def test_soft_deleted_talk_becomes_tombstone(api_client):
+    headers = register_and_login(api_client)
+    talk_id = add_talk("en", "Confined Spaces", hazard="Atmosphere")
+    version = sync(api_client, headers)["version"]
+
+    update_talk(talk_id, deleted_at=datetime.utcnow())
+    changes = sync(api_client, headers, version)
+    assert changes["deleted_talk_ids"] == [talk_id]
+    assert changes["talks"] == []
+
+    assert api_client.get(f"/talks/{talk_id}", headers=headers).status_code == 404
+    assert talk_id not in [t["id"] for t in api_client.get("/talks/?language=en", headers=headers).json()]
+    assert talk_id not in [t["id"] for t in sync(api_client, headers)["talks"]]
+
+
+def test_client_ahead_of_server_gets_full_sync(api_client):
+    headers = register_and_login(api_client)
+    version = sync(api_client, headers)["version"]
+    assert sync(api_client, headers, version + 1000)["full"] is True
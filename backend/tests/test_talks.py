@@ -0,0 +1,328 @@
+import os
+import uuid
+import pytest
+from app import models
+from app.database import TestingSessionLocal
+from tests.conftest import add_talk, register_and_login
+
+
+def test_catalog_cache_serves_until_version_bump(api_client, language):
+    headers = register_and_login(api_client)
+    add_talk(language, "Ladder Safety", hazard="Falls")
+
+    response = api_client.get(f"/talks/?language={language}", headers=headers)
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["Ladder Safety"]
+
+    # Written without a version bump: cached response is still served
+    add_talk(language, "Scaffold Safety", bump=False, hazard="Falls")
+    response = api_client.get(f"/talks/?language={language}", headers=headers)
+    assert [t["title"] for t in response.json()] == ["Ladder Safety"]
+
+    add_talk(language, "Roof Work", hazard="Falls")
+    response = api_client.get(f"/talks/?language={language}", headers=headers)
+    assert sorted(t["title"] for t in response.json()) == ["Ladder Safety", "Roof Work", "Scaffold Safety"]
+
+
+def test_filtered_catalog_endpoints(api_client, language):
+    headers = register_and_login(api_client)
+    add_talk(language, "Lockout Tagout", hazard="Electrical", industry="Manufacturing")
+    add_talk(language, "Trenching", hazard="Excavation", industry="Construction")
+
+    response = api_client.get(f"/talks/by_hazard?hazard=Electrical&language={language}", headers=headers)
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["Lockout Tagout"]
+
+    response = api_client.get(f"/talks/by_industry?industry=Construction&language={language}", headers=headers)
+    assert [t["title"] for t in response.json()] == ["Trenching"]
+
+    response = api_client.get("/talks/hazards", headers=headers)
+    assert {"Electrical", "Excavation"} <= set(response.json())
+
+
+def test_keyset_pagination(api_client, language):
+    headers = register_and_login(api_client)
+    ids = [add_talk(language, f"Talk {i}", hazard="Noise") for i in range(5)]
+
+    response = api_client.get(f"/talks/?language={language}&limit=2", headers=headers)
+    assert response.status_code == 200
+    page = response.json()
+    assert [t["id"] for t in page["items"]] == ids[:2]
+    assert page["next_after_id"] == ids[1]
+
+    seen = [t["id"] for t in page["items"]]
+    while page["next_after_id"] is not None:
+        page = api_client.get(
+            f"/talks/by_hazard?hazard=Noise&language={language}&limit=2&after_id={page['next_after_id']}",
+            headers=headers
+        ).json()
+        seen.extend(t["id"] for t in page["items"])
+    assert seen == ids
+
+
+def test_streamed_talk_list(api_client, language):
+    headers = register_and_login(api_client)
+    ids = [add_talk(language, f"Streamed {i}", industry="Mining") for i in range(3)]
+
+    response = api_client.get(f"/talks/by_industry?industry=Mining&language={language}&stream=true", headers=headers)
+    assert response.status_code == 200
+    assert [t["id"] for t in response.json()] == ids
+
+
+def test_search_talks(api_client, language):
+    headers = register_and_login(api_client)
+    add_talk(language, "Confined Space Entry", description="Atmospheric testing before entry")
+    add_talk(language, "Hot Work Permits", description="Fire watch for welding in confined areas")
+    add_talk(language, "Hand Tools")
+
+    response = api_client.get(f"/talks/search?q=confined&language={language}", headers=headers)
+    assert response.status_code == 200
+    # Title matches rank above description matches
+    assert [t["title"] for t in response.json()] == ["Confined Space Entry", "Hot Work Permits"]
+
+    response = api_client.get(f"/talks/search?q=weld&language={language}", headers=headers)
+    assert [t["title"] for t in response.json()] == ["Hot Work Permits"]
+
+
+def test_search_fallback_without_postgres():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.cache import catalog_cache
+    from app.search import search
+
+    # Due for a poll, so a search that consulted it would re-read the version
+    catalog_cache._checked_at = 0.0
+    app_version = catalog_cache._version
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        db.add_all([
+            models.Talk(title="Confined Space Entry", category="Hazards", language="en", related_title="a"),
+            models.Talk(title="Espacios Confinados", category="Hazards", language="es", related_title="a"),
+            models.Talk(title="Hot Work", description="Confined areas", category="Hazards", language="en", related_title="b"),
+        ])
+        db.commit()
+        assert [t.title for t in search(db, models.Talk, "confin", "en")] == ["Confined Space Entry", "Hot Work"]
+        assert [t.title for t in search(db, models.Talk, "espacios conf")] == ["Espacios Confinados"]
+        assert search(db, models.Talk, "ladder") == []
+        assert catalog_cache._version == app_version
+    finally:
+        db.close()
+
+
+def test_like_counters_follow_likes(api_client, language):
+    group = f"group_{uuid.uuid4().hex[:6]}"
+    english = add_talk(language, "Forklift Safety", related_title=group)
+    spanish = add_talk(language, "Seguridad con Montacargas", related_title=group)
+    alice, bob = register_and_login(api_client), register_and_login(api_client)
+
+    assert api_client.post(f"/talks/{english}/like", headers=alice).json()["message"] == "Talk liked successfully"
+    api_client.post(f"/talks/{spanish}/like", headers=bob)
+    response = api_client.get(f"/talks/{spanish}/likes", headers=alice)
+    assert response.json() == {"like_count": 2, "user_liked": True}
+
+    # Liking another translation of the same talk toggles the existing like
+    assert api_client.post(f"/talks/{spanish}/like", headers=alice).json()["message"] == "Talk unliked successfully"
+    assert api_client.get(f"/talks/{english}/likes", headers=alice).json() == {"like_count": 1, "user_liked": False}
+
+
+def test_like_toggle_returns_state_and_survives_double_taps(api_client, language):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.like_counters import toggle_talk_like
+
+    talk_id = add_talk(language, "Crane Signals", related_title=f"group_{uuid.uuid4().hex[:6]}")
+    headers = register_and_login(api_client)
+    assert api_client.post(f"/talks/{talk_id}/like", headers=headers).json() == {
+        "message": "Talk liked successfully", "liked": True, "like_count": 1
+    }
+    assert api_client.post(f"/talks/{talk_id}/like", headers=headers).json() == {
+        "message": "Talk unliked successfully", "liked": False, "like_count": 0
+    }
+    assert api_client.post("/talks/999999999/like", headers=headers).status_code == 404
+
+    db = TestingSessionLocal()
+    user = models.User(username=f"user_{uuid.uuid4().hex[:6]}", email=f"{uuid.uuid4().hex[:6]}@example.com")
+    db.add(user)
+    db.commit()
+
+    def tap(_):
+        session = TestingSessionLocal()
+        try:
+            result = toggle_talk_like(session, user.id, talk_id)
+            session.commit()
+            return result
+        finally:
+            session.close()
+
+    # Concurrent taps never raise; the counter matches the likes left behind
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(tap, range(16)))
+    assert all(result is not None for result in results)
+    try:
+        likes = db.query(models.TalkLike).filter(models.TalkLike.talk_id == talk_id).count()
+        assert api_client.get(f"/talks/{talk_id}/likes", headers=headers).json()["like_count"] == likes
+    finally:
+        db.close()
+
+
+def test_popular_talks_ranked_by_counter(api_client, language):
+    headers = register_and_login(api_client)
+    quiet = add_talk(language, "Quiet Talk", related_title=f"quiet_{uuid.uuid4().hex[:6]}")
+    loud = add_talk(language, "Loud Talk", related_title=f"loud_{uuid.uuid4().hex[:6]}")
+    api_client.post(f"/talks/{loud}/like", headers=headers)
+
+    response = api_client.get(f"/talks/popular?language={language}&limit=5", headers=headers)
+    assert response.status_code == 200
+    assert [(t["id"], t["like_count"]) for t in response.json()] == [(loud, 1), (quiet, 0)]
+
+
+def test_rebuild_like_counters():
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from app.like_counters import get_talk_like_count, rebuild_talk_group_stats
+
+    talk_id = add_talk("en", "Drifted Talk", related_title=f"group_{uuid.uuid4().hex[:6]}")
+    db = TestingSessionLocal()
+    try:
+        user, bob = [
+            models.User(username=f"user_{uuid.uuid4().hex[:6]}", email=f"{uuid.uuid4().hex[:6]}@example.com")
+            for _ in range(2)
+        ]
+        db.add_all([user, bob])
+        db.flush()
+        group_id = db.query(models.Talk.group_id).filter(models.Talk.id == talk_id).scalar()
+        # A like written without touching the counter
+        db.add(models.TalkLike(user_id=user.id, talk_id=talk_id, group_id=group_id))
+        db.commit()
+        assert get_talk_like_count(db, group_id) == 0
+
+        rebuild_talk_group_stats(db)
+        # Likes wait for the rebuild to commit rather than being miscounted
+        other = TestingSessionLocal()
+        try:
+            other.execute(text("SET lock_timeout = '100ms'"))
+            with pytest.raises(OperationalError):
+                other.execute(models.TalkLike.__table__.insert().values(
+                    user_id=bob.id, talk_id=talk_id, group_id=group_id
+                ))
+        finally:
+            other.rollback()
+            other.close()
+        db.commit()
+        assert get_talk_like_count(db, group_id) == 1
+    finally:
+        db.close()
+
+
+def test_translations_share_a_group():
+    group = f"group_{uuid.uuid4().hex[:6]}"
+    ids = [add_talk(language, f"Talk {language}", related_title=group) for language in ("en", "es", "fr")]
+    other = add_talk("en", "Unrelated", related_title=f"group_{uuid.uuid4().hex[:6]}")
+    db = TestingSessionLocal()
+    try:
+        group_ids = {talk.id: talk.group_id for talk in db.query(models.Talk).filter(models.Talk.id.in_(ids + [other]))}
+        assert len({group_ids[talk_id] for talk_id in ids}) == 1
+        assert group_ids[other] != group_ids[ids[0]]
+        assert db.query(models.TalkGroup).get(group_ids[ids[0]]).related_title == group
+    finally:
+        db.close()
+
+
+def test_catalog_etag_revalidation(api_client, language):
+    headers = register_and_login(api_client)
+    add_talk(language, "Heat Stress", hazard="Heat")
+
+    response = api_client.get(f"/talks/?language={language}", headers=headers)
+    etag = response.headers["etag"]
+
+    response = api_client.get(f"/talks/?language={language}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # Other filters get their own tag
+    response = api_client.get(f"/talks/by_hazard?hazard=Heat&language={language}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+    add_talk(language, "Cold Stress", hazard="Cold")
+    response = api_client.get(f"/talks/?language={language}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_batch_like_status(api_client, language):
+    headers = register_and_login(api_client)
+    group = f"group_{uuid.uuid4().hex[:6]}"
+    liked = add_talk(language, "Liked", related_title=group)
+    translation = add_talk(language, "Liked (fr)", related_title=group)
+    other = add_talk(language, "Other", related_title=f"group_{uuid.uuid4().hex[:6]}")
+    api_client.post(f"/talks/{liked}/like", headers=headers)
+
+    response = api_client.post("/talks/likes/batch", json={"talk_ids": [liked, translation, other, 999999]}, headers=headers)
+    assert response.status_code == 200
+    assert sorted(response.json(), key=lambda r: r["talk_id"]) == [
+        {"talk_id": liked, "like_count": 1, "user_liked": True},
+        {"talk_id": translation, "like_count": 1, "user_liked": True},
+        {"talk_id": other, "like_count": 0, "user_liked": False},
+    ]
+
+
+def test_facet_counts(api_client, language):
+    headers = register_and_login(api_client)
+    add_talk(language, "Lifting", hazard="Ergonomics", industry="Warehousing")
+    add_talk(language, "Pallet Jacks", hazard="Ergonomics", industry="Warehousing")
+    add_talk(language, "Dust", hazard="Respiratory", industry="Construction")
+    add_talk(language, "Untagged")
+
+    response = api_client.get(f"/talks/facets?language={language}", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {
+        "hazards": [{"name": "Ergonomics", "count": 2}, {"name": "Respiratory", "count": 1}],
+        "industries": [{"name": "Construction", "count": 1}, {"name": "Warehousing", "count": 2}]
+    }
+
+
+def test_catalog_bundle(api_client, language, tmp_path, monkeypatch):
+    from app import catalog_bundles
+    # The public /static mount must not expose the bundles
+    static = os.path.abspath(os.path.join(os.path.dirname(catalog_bundles.__file__), "static"))
+    assert os.path.commonpath([static, os.path.abspath(catalog_bundles.BUNDLE_DIR)]) != static
+    monkeypatch.setattr(catalog_bundles, "BUNDLE_DIR", str(tmp_path))
+    headers = register_and_login(api_client)
+    add_talk(language, "Bundled Talk", hazard="Noise", industry="Mining")
+
+    response = api_client.get(f"/catalog/{language}", headers=headers, follow_redirects=False)
+    assert response.status_code == 307
+    bundle_url = response.headers["location"]
+
+    response = api_client.get(bundle_url, headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "immutable" in response.headers["cache-control"]
+    bundle = response.json()
+    assert [t["title"] for t in bundle["talks"]] == ["Bundled Talk"]
+    assert bundle["hazards"] == ["Noise"] and bundle["industries"] == ["Mining"]
+
+    # A q-value of zero refuses the coding
+    response = api_client.get(bundle_url, headers={**headers, "Accept-Encoding": "br;q=0, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    response = api_client.get(bundle_url, headers={**headers, "Accept-Encoding": "gzip;q=0.5, br"})
+    assert response.headers["content-encoding"] == "br"
+
+    # A catalog change moves the bundle to a new URL
+    add_talk(language, "Second Talk")
+    response = api_client.get(f"/catalog/{language}", headers=headers, follow_redirects=False)
+    assert response.headers["location"] != bundle_url
+    # ...while the old one keeps working for clients that already have it
+    assert api_client.get(bundle_url, headers=headers).status_code == 200
+
+    # A worker whose polled version lags never rebuilds over a newer manifest
+    manifest = catalog_bundles.load_manifest()
+    monkeypatch.setattr(catalog_bundles.catalog_cache, "version", lambda db: manifest["version"] - 1)
+    db = TestingSessionLocal()
+    try:
+        assert catalog_bundles.current_manifest(db) == manifest
+        assert catalog_bundles.build_catalog_bundles(db) == manifest
+    finally:
+        db.close()
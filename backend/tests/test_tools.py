@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from app import models
+from app.database import TestingSessionLocal
+from tests.conftest import register_and_login
+
+
+def add_tool(language, title, **fields):
+    db = TestingSessionLocal()
+    try:
+        tool = models.Tool(
+            title=title,
+            category=fields.pop("category", "General"),
+            language=language,
+            related_title=fields.pop("related_title", title),
+            **fields
+        )
+        db.add(tool)
+        db.commit()
+        return tool.id
+    finally:
+        db.close()
+
+
+def test_search_tools(api_client, language):
+    add_tool(language, "Inspection Checklist", description="Daily scaffold inspection")
+    add_tool(language, "Incident Report Form")
+
+    response = api_client.get(f"/tools/search?q=inspect&language={language}")
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["Inspection Checklist"]
+
+
+def test_tool_list_etag(api_client, language):
+    add_tool(language, "Toolbox Talk Sign-in Sheet")
+    response = api_client.get(f"/tools/?language={language}")
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["Toolbox Talk Sign-in Sheet"]
+
+    response = api_client.get(f"/tools/?language={language}", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+
+def test_batch_tool_like_status(api_client, language):
+    alice, bob = register_and_login(api_client), register_and_login(api_client)
+    first = add_tool(language, "Hazard Assessment")
+    second = add_tool(language, "JSA Template")
+    api_client.post(f"/tools/{first}/like", headers=alice)
+    api_client.post(f"/tools/{first}/like", headers=bob)
+    api_client.post(f"/tools/{second}/like", headers=bob)
+
+    assert api_client.post(f"/tools/{second}/like", headers=alice).json() == {
+        "message": "Tool liked", "liked": True, "like_count": 2
+    }
+    assert api_client.post(f"/tools/{second}/like", headers=alice).json()["like_count"] == 1
+
+    response = api_client.post("/tools/likes/batch", json={"tool_ids": [first, second]}, headers=alice)
+    assert response.status_code == 200
+    assert sorted(response.json(), key=lambda r: r["tool_id"]) == [
+        {"tool_id": first, "like_count": 2, "user_liked": True},
+        {"tool_id": second, "like_count": 1, "user_liked": False},
+    ]
+
+
+def backdate_likes(tool_id, days):
+    db = TestingSessionLocal()
+    try:
+        db.query(models.ToolLike).filter(models.ToolLike.tool_id == tool_id).update(
+            {models.ToolLike.created_at: datetime.utcnow() - timedelta(days=days)}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_popular_tools_ranking_and_windows(api_client, language):
+    users = [register_and_login(api_client) for _ in range(3)]
+    old = add_tool(language, "Old Favourite")
+    fresh = add_tool(language, "New Checklist")
+    aging = add_tool(language, "Last Week Form")
+    unliked = add_tool(language, "Unused Form")
+    for headers in users:
+        api_client.post(f"/tools/{old}/like", headers=headers)
+    for headers in users[:2]:
+        api_client.post(f"/tools/{fresh}/like", headers=headers)
+        api_client.post(f"/tools/{aging}/like", headers=headers)
+    backdate_likes(old, 30)
+    backdate_likes(aging, 6)
+
+    # Routed ahead of /tools/{tool_id}
+    response = api_client.get(f"/tools/popular?language={language}&limit=10")
+    assert response.status_code == 200
+    assert [(t["id"], t["like_count"]) for t in response.json()] == [(old, 3), (fresh, 2), (aging, 2), (unliked, 0)]
+
+    # Inside a week, two fresh likes outweigh two from six days ago
+    response = api_client.get(f"/tools/popular?language={language}&limit=3&window=7d")
+    assert [(t["id"], t["like_count"]) for t in response.json()] == [(fresh, 2), (aging, 2), (old, 0)]
+
+    assert api_client.get("/tools/popular?window=7x").status_code == 422
+    assert api_client.get("/tools/popular?window=8760h").status_code == 200
+    assert api_client.get("/tools/popular?window=366d").status_code == 422
+    assert api_client.get("/tools/popular?window=99999999999999999999d").status_code == 422
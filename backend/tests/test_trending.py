@@ -0,0 +1,70 @@
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app import models
+from app.database import TestingSessionLocal
+from app.trending import WATERMARK, roll_up_talk_activity
+from tests.conftest import add_talk, register_and_login
+
+
+def test_trending_ranks_recent_activity(api_client, language):
+    headers = register_and_login(api_client)
+    now = datetime.utcnow()
+    old = add_talk(language, "Old News", related_title=f"group_{uuid.uuid4().hex[:6]}")
+    liked = add_talk(language, "Fresh Likes", related_title=f"group_{uuid.uuid4().hex[:6]}")
+    viewed = add_talk(language, "Fresh Views", related_title=f"group_{uuid.uuid4().hex[:6]}")
+
+    db = TestingSessionLocal()
+    try:
+        # Start the rollup just before the backdated events below
+        watermark = db.query(models.RollupWatermark).get(WATERMARK)
+        if watermark is None:
+            db.add(models.RollupWatermark(name=WATERMARK, rolled_up_to=now - timedelta(days=3)))
+        else:
+            watermark.rolled_up_to = now - timedelta(days=3)
+        users = [models.User(username=f"user_{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@example.com") for _ in range(3)]
+        db.add_all(users)
+        db.flush()
+
+        groups = dict(db.query(models.Talk.id, models.Talk.group_id).filter(models.Talk.id.in_([old, liked, viewed])))
+        for user in users:
+            db.add(models.TalkLike(user_id=user.id, talk_id=old, group_id=groups[old], created_at=now - timedelta(hours=30)))
+        for user in users[:2]:
+            db.add(models.TalkLike(user_id=user.id, talk_id=liked, group_id=groups[liked], created_at=now - timedelta(hours=1)))
+        for user in users:
+            db.add(models.TalkView(user_id=user.id, talk_title="Fresh Views", language=language, viewed_at=now - timedelta(hours=1)))
+        db.commit()
+
+        # The rows were stored just now, however old the events they record
+        until = datetime.utcnow()
+        assert roll_up_talk_activity(db, until=until)[1] == until
+        # A second run has nothing new to count
+        assert roll_up_talk_activity(db, until=until) == (until, until)
+        db.commit()
+    finally:
+        db.close()
+
+    # Old: 3 likes * 3 at 30h; fresh: 2 likes * 3 at 1h; views: 3 views * 1 at 1h
+    response = api_client.get(f"/talks/trending?language={language}&hours=48", headers=headers)
+    assert response.status_code == 200
+    assert [t["id"] for t in response.json()] == [liked, old, viewed]
+
+    response = api_client.get(f"/talks/trending?language={language}&hours=24", headers=headers)
+    assert [t["id"] for t in response.json()] == [liked, viewed]
+
+    # An offline view replayed after the watermark passed its time still counts
+    db = TestingSessionLocal()
+    try:
+        user = models.User(username=f"user_{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@example.com")
+        db.add(user)
+        db.flush()
+        db.add(models.TalkView(user_id=user.id, talk_title="Fresh Views", language=language, viewed_at=now - timedelta(hours=1)))
+        db.commit()
+        roll_up_talk_activity(db, until=datetime.utcnow())
+        db.commit()
+        views = db.query(func.sum(models.TalkActivityHourly.views)).filter(
+            models.TalkActivityHourly.group_id == groups[viewed]
+        ).scalar()
+    finally:
+        db.close()
+    assert views == 4
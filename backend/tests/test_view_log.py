@@ -0,0 +1,92 @@
+import gzip
+import uuid
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import text
+from app import models
+from app.database import TestingSessionLocal, engine
+from app.related_talks import RELATED_SESSION_GAP, ROLL_UP_PAIRS
+from app.trending import ROLL_UP_VIEWS, oldest_new_view
+from app.view_log import (
+    archive_view_partition,
+    create_view_partition,
+    drop_view_partition,
+    expired_view_partitions,
+    view_partitions,
+)
+from tests.conftest import register_and_login
+
+
+@pytest.fixture
+def conn():
+    if engine.dialect.name != "postgresql":
+        pytest.skip("talk_views is only partitioned on Postgres")
+    conn = engine.connect()
+    transaction = conn.begin()
+    try:
+        yield conn
+    finally:
+        transaction.rollback()
+        conn.close()
+
+
+def test_every_open_is_logged(api_client):
+    headers = register_and_login(api_client)
+    title = f"Confined Spaces {uuid.uuid4().hex[:6]}"
+    for _ in range(2):
+        api_client.post("/history/", json={"talk_title": title, "language": "en"}, headers=headers)
+    # A retried upload, and a view repeated within it, are logged once; a
+    # view older than the replay window isn't logged at all
+    offline = (datetime.utcnow() - timedelta(days=2)).replace(microsecond=0)
+    for _ in range(2):
+        api_client.post("/history/batch", json={"entries": [
+            {"talk_title": title, "language": "en", "accessed_at": offline.isoformat()},
+            {"talk_title": title, "language": "en", "accessed_at": offline.isoformat()},
+            {"talk_title": title, "language": "en", "accessed_at": "2001-01-01T08:00:00"},
+        ]}, headers=headers)
+
+    db = TestingSessionLocal()
+    try:
+        views = db.query(models.TalkView.viewed_at).filter(models.TalkView.talk_title == title).all()
+    finally:
+        db.close()
+    # Three views, but history keeps one row for the talk
+    assert len(views) == 3
+    assert min(views)[0] == offline
+    assert len(api_client.get("/history/", headers=headers).json()) == 1
+
+
+def test_expired_partitions_are_archived_and_dropped(conn, tmp_path):
+    create_view_partition(conn, date(2001, 1, 1))
+    conn.execute(models.TalkView.__table__.insert(), [
+        {"user_id": 1, "talk_title": "Ladder Safety", "language": "en", "viewed_at": datetime(2001, 1, day)}
+        for day in (3, 9)
+    ])
+    assert "talk_views_2001_01" in expired_view_partitions(conn, keep_months=12)
+    assert "talk_views_2001_01" not in expired_view_partitions(conn, keep_months=12, today=date(2001, 6, 1))
+
+    # Recent ranges only scan recent partitions
+    plan = "\n".join(row[0] for row in conn.execute(text(
+        "EXPLAIN SELECT count(*) FROM talk_views WHERE viewed_at > now() - interval '1 hour'"
+    )))
+    assert "talk_views_2001_01" not in plan
+    # So do the rollups, whose new views may be far older than the watermark
+    params = {"since": datetime.utcnow(), "until": datetime.utcnow()}
+    params["oldest"] = oldest_new_view(params["since"])
+    for rollup in (ROLL_UP_VIEWS, ROLL_UP_PAIRS):
+        plan = "\n".join(row[0] for row in conn.execute(
+            text(f"EXPLAIN {rollup.text}"), {**params, "gap": RELATED_SESSION_GAP}
+        ))
+        assert "talk_views_2001_01" not in plan
+
+    path, rows = archive_view_partition(conn, "talk_views_2001_01", str(tmp_path))
+    assert rows == 2
+    with gzip.open(path, "rt") as archived:
+        lines = archived.read().splitlines()
+    assert lines[0] == "user_id,talk_title,language,viewed_at"
+    assert [line.split(",")[-1] for line in lines[1:]] == ["2001-01-03 00:00:00", "2001-01-09 00:00:00"]
+
+    drop_view_partition(conn, "talk_views_2001_01")
+    assert date(2001, 1, 1) not in view_partitions(conn)
+    with pytest.raises(ValueError):
+        drop_view_partition(conn, "talk_history")